@@ -0,0 +1,82 @@
+"""
+Benchmark of blitting sprite frames and the background to the display
+
+compares surfaces as loaded from disk with surfaces converted to the display
+format, with and without RLEACCEL on the colorkey.
+
+run from the top of the project:
+    python -m benchmarks.render
+
+set SDL_VIDEODRIVER=dummy to run without a window.
+"""
+
+import os
+import timeit
+
+import pygame
+
+RESOURCE_PATH = 'resources'
+SHEET = 'elisa-spritesheet1.png'
+FRAMES = [(10, 10, 34, 44), (34, 254, 52, 52), (304, 132, 36, 40),
+          (190, 130, 28, 44), (74, 132, 32, 40)]
+BACKGROUND = 'exterior-parallaxBG1.png'
+SPRITES = 200
+NUMBER = 20
+
+
+def load(filename):
+    return pygame.image.load(os.path.join(RESOURCE_PATH, filename))
+
+
+def cut(sheet, flags=0):
+    frames = []
+    for rect in FRAMES:
+        frame = sheet.subsurface(rect).copy()
+        frame.set_colorkey(frame.get_at((0, 0)), flags)
+        frames.append(frame)
+    return frames
+
+
+def blit_sprites(target, frames):
+    blit = target.blit
+    count = len(frames)
+    for i in range(SPRITES):
+        blit(frames[i % count], ((i * 37) % 800, (i * 53) % 400))
+
+
+def blit_background(target, bg):
+    target.blit(bg, (0, 0))
+    target.blit(bg, (bg.get_width(), 0))
+
+
+def measure(func, *args):
+    best = min(timeit.repeat(lambda: func(*args), number=NUMBER, repeat=5))
+    return best / NUMBER * 1000
+
+
+def main():
+    pygame.init()
+    screen = pygame.display.set_mode((900, 500))
+    target = pygame.Surface((450, 250)).convert()
+
+    sheet = load(SHEET)
+    bg = load(BACKGROUND)
+    cases = [
+        ('sprites, as loaded', blit_sprites, cut(sheet)),
+        ('sprites, converted', blit_sprites, cut(sheet.convert())),
+        ('sprites, converted + RLE', blit_sprites,
+         cut(sheet.convert(), pygame.RLEACCEL)),
+        ('background, as loaded', blit_background, bg),
+        ('background, converted', blit_background, bg.convert()),
+    ]
+
+    print('display: {} bit'.format(screen.get_bitsize()))
+    print('{} sprites per frame:'.format(SPRITES))
+    for name, func, source in cases:
+        print('  {:<28} {:8.3f} ms'.format(name, measure(func, target, source)))
+
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark of the cold start of the game, up to the first frame
+
+starts the game in a new process a number of times, each drawing one frame
+and quitting, and reports the time to the first frame given by the startup
+profiler.  the time of the slowest imports and steps of startup are
+reported for the fastest run.
+
+run from the top of the project:
+    python -m benchmarks.startup
+
+pass --log to add the result to a CSV file, to track it over time.  set
+SDL_VIDEODRIVER=dummy and SDL_AUDIODRIVER=dummy to run without a window.
+"""
+
+import argparse
+import csv
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 10
+FIRST_FRAME = re.compile(r'time to first frame: ([\d.]+) ms')
+
+
+def run_once(extra):
+    command = [sys.executable, 'run_game.py', '--profile-startup',
+               '--first-frame-only'] + extra
+    result = subprocess.run(command, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, universal_newlines=True,
+                            check=True)
+    match = FIRST_FRAME.search(result.stdout)
+    if match is None:
+        raise RuntimeError('no startup report:\n' + result.stdout)
+    report = result.stdout[result.stdout.index('startup profile'):]
+    return float(match.group(1)), report
+
+
+def revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              stdout=subprocess.PIPE,
+                              universal_newlines=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--runs', type=int, default=RUNS)
+    parser.add_argument('--log', help='CSV file to add the result to')
+    parser.add_argument('--stream', action='store_true',
+                        help='start the game with a streamed level')
+    args = parser.parse_args()
+
+    extra = ['--stream'] if args.stream else []
+    times = []
+    best = None
+    for i in range(args.runs):
+        elapsed, report = run_once(extra)
+        times.append(elapsed)
+        if best is None or elapsed < best[0]:
+            best = elapsed, report
+
+    median = statistics.median(times)
+    print(best[1].rstrip())
+    print()
+    print('first frame over {} runs: {:.1f} ms median, {:.1f} ms best'.format(
+        args.runs, median, min(times)))
+
+    if args.log:
+        new = not os.path.exists(args.log)
+        with open(args.log, 'a', newline='') as fp:
+            writer = csv.writer(fp)
+            if new:
+                writer.writerow(['date', 'revision', 'runs', 'median_ms',
+                                 'best_ms'])
+            writer.writerow([time.strftime('%Y-%m-%d %H:%M'), revision(),
+                             args.runs, '{:.1f}'.format(median),
+                             '{:.1f}'.format(min(times))])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Micro-benchmark of the vector math done for each body in PhysicsGroup.update
+
+compares the operator based code with the in-place vector methods.
+
+run from the top of the project:
+    python -m benchmarks.vector_step
+"""
+
+import timeit
+from physics import euclid
+
+TIMESTEP = 1 / 120.
+GRAVITY_DELTA = euclid.Vector3(0, 0, 10.2) * TIMESTEP
+NUMBER = 200000
+
+
+def operators(acc, vel):
+    acc += GRAVITY_DELTA
+    vel += acc * TIMESTEP
+    x, y, z = vel
+
+
+def in_place(acc, vel):
+    acc.add_ip(GRAVITY_DELTA)
+    vel.add_scaled(acc, TIMESTEP)
+    x = vel.x
+    y = vel.y
+    z = vel.z
+
+
+def measure(func):
+    acc = euclid.Vector3(0, 0, 0)
+    vel = euclid.Vector3(0, 0, 0)
+    best = min(timeit.repeat(lambda: func(acc, vel), number=NUMBER, repeat=5))
+    return best / NUMBER * 1e9
+
+
+def main():
+    old = measure(operators)
+    new = measure(in_place)
+    print('per body step:')
+    print('  operators: {:8.1f} ns'.format(old))
+    print('  in place:  {:8.1f} ns'.format(new))
+    print('  saving:    {:8.1f} ns ({:.0%})'.format(old - new, 1 - new / old))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Process-wide cache of images and sounds.
+
+Every file is loaded once, the first time it is asked for, and the same
+object is returned after that.  Sprites should only take subsurfaces of a
+cached image, so creating a sprite never touches the filesystem and never
+copies pixels.
+
+Once the display exists, images are converted to its pixel format as they
+are loaded, so blitting them needs no conversion.  Call AssetCache.convert()
+again when the display mode changes.
+
+Cached objects are shared; do not draw on a cached image.
+"""
+
+import os
+import threading
+import pygame
+
+
+def convert(surface):
+    """
+    return a copy of surface in the display format
+
+    surfaces with per pixel alpha are converted with convert_alpha.  a
+    colorkey is kept, with RLEACCEL.
+    """
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+
+    colorkey = surface.get_colorkey()
+    surface = surface.convert()
+    if colorkey is not None:
+        surface.set_colorkey(colorkey, pygame.RLEACCEL)
+    return surface
+
+
+def load_image(path):
+    image = pygame.image.load(path)
+    if pygame.display.get_surface() is not None:
+        image = convert(image)
+    return image
+
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+def sound_bytes(sound):
+    frequency, size, channels = pygame.mixer.get_init()
+    return int(sound.get_length() * frequency) * abs(size) // 8 * channels
+
+
+class AssetCache:
+    """
+    Assets keyed by path, with counters for hits, misses and bytes held
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._assets)
+
+    def _get(self, path, load, size):
+        path = os.path.normpath(path)
+        with self._lock:
+            try:
+                asset = self._assets[path]
+            except KeyError:
+                pass
+            else:
+                self.hits += 1
+                return asset
+
+            asset = load(path)
+            self.misses += 1
+            self.bytes += size(asset)
+            self._assets[path] = asset
+            return asset
+
+    def image(self, path):
+        return self._get(path, load_image, surface_bytes)
+
+    def sound(self, path):
+        return self._get(path, pygame.mixer.Sound, sound_bytes)
+
+    def convert(self):
+        """
+        convert every image to the current display format
+        """
+        with self._lock:
+            for path, asset in self._assets.items():
+                if isinstance(asset, pygame.Surface):
+                    converted = convert(asset)
+                    self.bytes += surface_bytes(converted) - surface_bytes(asset)
+                    self._assets[path] = converted
+
+    def clear(self):
+        with self._lock:
+            self._assets.clear()
+            self.bytes = 0
+
+    def report(self):
+        return 'assets: {}  hits: {}  misses: {}  held: {:.1f} KiB'.format(
+            len(self._assets), self.hits, self.misses, self.bytes / 1024)
+
+
+cache = AssetCache()
@@ -0,0 +1,160 @@
+"""
+Texture atlas for sprite frames.
+
+Frames cut from many sprite sheets are copied into one surface (or a few,
+if they do not fit in one page), placed by shelf packing: frames are sorted
+by height and put side by side in rows, starting a new row when one is
+full.  The atlas keeps a table of the rect and anchor of every frame, and a
+subsurface for every frame, so the frames share the pixels of one surface.
+Call convert() to change the pages to the display format.
+"""
+
+from collections import namedtuple
+
+import pygame
+
+
+AtlasFrame = namedtuple('AtlasFrame', 'page, rect, anchor')
+
+
+def shelf_pack(sizes, page_size, padding=1):
+    """
+    place rectangles of sizes on pages of page_size
+
+    returns a list of (page, x, y), in the same order as sizes, and a list
+    of the size used on each page
+    """
+    max_width, max_height = page_size
+    order = sorted(range(len(sizes)),
+                   key=lambda i: (sizes[i][1], sizes[i][0]), reverse=True)
+
+    positions = [None] * len(sizes)
+    used = []
+    page = -1
+    x = y = shelf = 0
+    for i in order:
+        w, h = sizes[i]
+        if w > max_width or h > max_height:
+            raise ValueError('{}x{} does not fit on a page'.format(w, h))
+
+        # start a new shelf, or a new page if there is no room for one
+        if page < 0 or x + w > max_width:
+            if page >= 0:
+                y += shelf + padding
+            x = shelf = 0
+            if page < 0 or y + h > max_height:
+                page += 1
+                y = 0
+                used.append([0, 0])
+
+        positions[i] = page, x, y
+        x += w + padding
+        shelf = max(shelf, h)
+        used[page][0] = max(used[page][0], x - padding)
+        used[page][1] = max(used[page][1], y + h)
+
+    return positions, [tuple(size) for size in used]
+
+
+class Atlas:
+    """
+    Frames packed into as few surfaces as possible
+
+    Add every frame with a key, then call build().  Frames with a colorkey
+    are drawn over the atlas colorkey; if any frame has per pixel alpha, the
+    pages have per pixel alpha instead.
+
+    usage:
+        atlas = Atlas()
+        atlas.add(('hero', 'idle', 0), image, anchor)
+        atlas.build()
+        image = atlas.image(('hero', 'idle', 0))
+    """
+
+    def __init__(self, page_size=(512, 512), padding=1, colorkey=None):
+        self.page_size = page_size
+        self.padding = padding
+        self.colorkey = colorkey
+        self.pages = []
+        self.frames = {}
+        self.images = {}
+        self._pending = []
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self, key):
+        return key in self.frames
+
+    def add(self, key, image, anchor=(0, 0)):
+        self._pending.append((key, image, anchor))
+
+    def image(self, key):
+        return self.images[key]
+
+    def build(self):
+        """
+        pack every frame added since the last build onto new pages
+        """
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        alpha = any(image.get_flags() & pygame.SRCALPHA
+                    for key, image, anchor in pending)
+        colorkey = self.colorkey
+        if colorkey is None:
+            colorkeys = [image.get_colorkey() for key, image, anchor in pending]
+            colorkey = next((c for c in colorkeys if c), (255, 0, 255))
+            self.colorkey = colorkey
+
+        sizes = [image.get_size() for key, image, anchor in pending]
+        positions, used = shelf_pack(sizes, self.page_size, self.padding)
+
+        first = len(self.pages)
+        for size in used:
+            if alpha:
+                page = pygame.Surface(size, pygame.SRCALPHA, 32)
+                page.fill((0, 0, 0, 0))
+            else:
+                page = pygame.Surface(size, 0, 32)
+                page.fill(colorkey)
+                page.set_colorkey(colorkey)
+            self.pages.append(page)
+
+        for (key, image, anchor), (index, x, y) in zip(pending, positions):
+            index += first
+            page = self.pages[index]
+            rect = pygame.Rect((x, y), image.get_size())
+            page.blit(image, rect)
+            frame = page.subsurface(rect)
+            if not alpha:
+                frame.set_colorkey(colorkey)
+            self.frames[key] = AtlasFrame(index, rect, anchor)
+            self.images[key] = frame
+
+    def convert(self):
+        """
+        convert the pages to the display format and make new frame images
+
+        frames with a colorkey use RLEACCEL.  images returned before this
+        was called are not changed.
+        """
+        pages = []
+        for page in self.pages:
+            if page.get_flags() & pygame.SRCALPHA:
+                page = page.convert_alpha()
+            else:
+                # pages are not blitted, only their frames, so RLE is only
+                # set on the frames
+                page = page.convert()
+                page.set_colorkey(self.colorkey)
+            pages.append(page)
+        self.pages = pages
+
+        for key, (index, rect, anchor) in self.frames.items():
+            page = self.pages[index]
+            frame = page.subsurface(rect)
+            if page.get_colorkey() is not None:
+                frame.set_colorkey(self.colorkey, pygame.RLEACCEL)
+            self.images[key] = frame
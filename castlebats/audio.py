@@ -0,0 +1,168 @@
+"""
+Sound effects, played through a fixed pool of mixer channels.
+
+Game logic does not play sounds itself.  It asks for a sound with play,
+which only queues the request, and may be done from any thread.  Once per
+frame, update plays the queued requests:
+
+- requests for the same sound in one frame are played once, at the
+  loudest volume asked for
+- each request is made quieter by its distance from the listener, and
+  dropped if it is too quiet to hear
+- each sound has a limit of instances playing at once.  when a sound is
+  at its limit, its oldest instance is restarted
+- channels come from a fixed pool.  when every channel is busy, the
+  channel that has played longest is taken
+
+Sounds are loaded through the asset cache, so every sound has one decoded
+Sound object, shared by every request for it.
+"""
+
+import collections
+import time
+
+import pygame
+
+from castlebats.assets import cache
+
+
+class AudioManager:
+    """
+    Play queued sound requests once per frame
+
+    channels:    size of the channel pool
+    voices:      instances of a sound that may play at once, unless given
+                 when the sound is added
+    hearing:     distance from the listener, in map pixels, at which sounds
+                 can no longer be heard
+    min_volume:  sounds quieter than this are not played
+
+    the mixer may be opened after sounds are added; nothing is played
+    before start is called.
+
+    usage:
+        audio = AudioManager()
+        audio.add('sword', 'resources/sword2.wav', voices=1)
+        pygame.mixer.init()
+        audio.start()
+        while running:
+            audio.play('sword', position)    # from game logic
+            audio.update(camera)             # once per frame
+    """
+
+    def __init__(self, channels=8, voices=2, hearing=600, min_volume=.05):
+        self.size = channels
+        self.voices = voices
+        self.hearing = hearing
+        self.min_volume = min_volume
+        self.paths = {}
+        self.limits = {}
+        self.sounds = {}
+        self.channels = []
+        self.started = {}
+        self.playing = {}
+        self.running = False
+        self.played = 0
+        self.culled = 0
+        self.restarted = 0
+        self.stolen = 0
+        self._requests = collections.deque()
+
+    def add(self, name, path, voices=None):
+        """
+        add a sound to be played by name
+        """
+        self.paths[name] = path
+        self.limits[name] = self.voices if voices is None else voices
+        if self.running:
+            self.sounds[name] = cache.sound(path)
+
+    def start(self):
+        """
+        load the sounds and make the channel pool.  the mixer must be open
+        """
+        pygame.mixer.set_num_channels(max(self.size,
+                                          pygame.mixer.get_num_channels()))
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.size)]
+        for name, path in self.paths.items():
+            self.sounds[name] = cache.sound(path)
+        self.running = True
+
+    def play(self, name, position=None, volume=1.0):
+        """
+        ask for a sound to be played on the next update
+
+        position is where the sound is made, in map pixels, or None for a
+        sound that is heard the same everywhere
+        """
+        self._requests.append((name, position, volume))
+
+    def hear(self, listener, position, volume):
+        """
+        return the (left, right) volume of a sound at position
+        """
+        if position is None or listener is None:
+            return volume, volume
+        dx = position[0] - listener[0]
+        dy = position[1] - listener[1]
+        distance = (dx * dx + dy * dy) ** .5
+        volume *= max(0.0, 1.0 - distance / self.hearing)
+        pan = max(-1.0, min(1.0, dx / self.hearing))
+        return volume * min(1.0, 1.0 - pan), volume * min(1.0, 1.0 + pan)
+
+    def update(self, listener=None):
+        """
+        play the sounds asked for since the last update
+
+        listener is the position the sounds are heard from, in map pixels
+        """
+        loudest = {}
+        requests = self._requests
+        while requests:
+            name, position, volume = requests.popleft()
+            left, right = self.hear(listener, position, volume)
+            if max(left, right) < self.min_volume:
+                self.culled += 1
+                continue
+            other = loudest.get(name)
+            if other is None or max(left, right) > max(other):
+                loudest[name] = left, right
+
+        if not self.running:
+            return
+
+        for name, (left, right) in loudest.items():
+            channel = self._channel(name)
+            channel.play(self.sounds[name])
+            channel.set_volume(left, right)
+            self.started[channel] = time.perf_counter()
+            self.playing[channel] = name
+            self.played += 1
+
+    def _channel(self, name):
+        # the channel to play a new instance of the sound named on
+        busy = [channel for channel in self.channels if channel.get_busy()]
+        instances = [channel for channel in busy
+                     if self.playing.get(channel) == name]
+        if len(instances) >= self.limits[name]:
+            self.restarted += 1
+            return min(instances, key=self.started.get)
+
+        for channel in self.channels:
+            if not channel.get_busy():
+                return channel
+
+        self.stolen += 1
+        return min(busy, key=self.started.get)
+
+    def stop(self):
+        for channel in self.channels:
+            channel.stop()
+        self._requests.clear()
+
+    def report(self):
+        busy = sum(1 for channel in self.channels if channel.get_busy())
+        return ('audio: {}/{} channels busy  played: {}  culled: {}  '
+                'restarted: {}  stolen: {}'.format(
+                    busy, len(self.channels), self.played, self.culled,
+                    self.restarted, self.stolen))
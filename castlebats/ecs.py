@@ -0,0 +1,224 @@
+"""
+Entity-component storage for actors.
+
+Components are stored in columns: one numpy array per component, with one
+row per entity.  Rows are kept packed, so systems can work on every entity
+at once with a few numpy operations instead of calling a method on each
+actor.
+
+Objects that cannot be stored in an array (the physics body and the actor
+that owns the entity) are kept in lists that follow the same rows.
+
+The physics bodies are still the source of truth for position and
+velocity; the columns are a copy.  sync_bodies copies every body into the
+columns once per tick, and that copy is a Python loop over the bodies, so
+systems save the per-actor method calls but not a per-actor cost
+altogether.  Systems that change velocity, like castlebats.swarm, must
+write it back to the bodies, also one body at a time.
+"""
+
+import numpy
+
+from castlebats.slotmap import SlotMap
+
+
+# categories
+HERO = 0
+ENEMY = 1
+SWARM = 2       # enemies steered by castlebats.swarm
+
+# animation modes
+ONCE = 0        # play once, then mark the animation as finished
+LOOP = 1        # start again from the first frame
+HOLD = 2        # stay on the last frame
+
+
+class World:
+    """
+    Component columns for every entity
+
+    Entities are generational handles from a SlotMap.  Use row() to find
+    where an entity is stored; rows change when other entities are
+    destroyed.  row() raises KeyError for an entity that was destroyed.
+
+    position, size:  bbox of the body, updated by sync_bodies()
+    velocity:        velocity of the body, updated by sync_bodies()
+    category:        HERO, ENEMY or SWARM
+    alive:           False once the entity should be removed
+    anim_*:          animation state; see advance_animation()
+    """
+
+    # name: (shape of one row, dtype, default)
+    columns = {
+        'position': ((3, ), float, 0),
+        'size': ((3, ), float, 0),
+        'velocity': ((3, ), float, 0),
+        'category': ((), numpy.int8, 0),
+        'alive': ((), bool, True),
+        'anim_timer': ((), float, 0),
+        'anim_ttl': ((), float, 0),
+        'anim_frame': ((), numpy.int32, 0),
+        'anim_length': ((), numpy.int32, 1),
+        'anim_mode': ((), numpy.int8, ONCE),
+        'anim_finished': ((), bool, False),
+    }
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.capacity = 0
+        self.entities = []
+        self.bodies = []
+        self.actors = []
+        self._rows = SlotMap()
+        self._grow(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, entity):
+        return entity in self._rows
+
+    def _grow(self, capacity):
+        for name, (shape, dtype, default) in self.columns.items():
+            column = numpy.full((capacity, ) + shape, default, dtype=dtype)
+            if self.count:
+                column[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def row(self, entity):
+        return self._rows[entity]
+
+    def create(self, category, body, actor=None):
+        """
+        create a new entity and return it
+        """
+        if self.count == self.capacity:
+            self._grow(self.capacity * 2)
+
+        row = self.count
+        self.count += 1
+        entity = self._rows.insert(row)
+        self.entities.append(entity)
+        self.bodies.append(body)
+        self.actors.append(actor)
+
+        for name, (shape, dtype, default) in self.columns.items():
+            getattr(self, name)[row] = default
+        self.category[row] = category
+        self.position[row] = body.bbox.origin
+        self.size[row] = body.bbox.size
+        self.velocity[row] = tuple(body.vel)
+        return entity
+
+    def destroy(self, entity):
+        """
+        remove an entity.  the last row is moved into its place
+        """
+        row = self._rows.remove(entity)
+        last = self.count - 1
+        if row != last:
+            for name in self.columns:
+                column = getattr(self, name)
+                column[row] = column[last]
+            moved = self.entities[last]
+            self.entities[row] = moved
+            self.bodies[row] = self.bodies[last]
+            self.actors[row] = self.actors[last]
+            self._rows[moved] = row
+
+        self.entities.pop()
+        self.bodies.pop()
+        self.actors.pop()
+        self.count = last
+
+    def start_animation(self, entity, ttl, length, mode):
+        row = self._rows[entity]
+        self.anim_timer[row] = ttl
+        self.anim_ttl[row] = ttl
+        self.anim_frame[row] = 0
+        self.anim_length[row] = length
+        self.anim_mode[row] = mode
+        self.anim_finished[row] = False
+
+
+# =============================================================================
+# systems
+
+
+def sync_bodies(world):
+    """
+    copy bbox and velocity of every physics body into the world
+    """
+    n = world.count
+    if not n:
+        return
+    bodies = world.bodies
+    world.position[:n] = [body.bbox.origin for body in bodies]
+    world.size[:n] = [body.bbox.size for body in bodies]
+    world.velocity[:n] = [tuple(body.vel) for body in bodies]
+
+
+def advance_animation(world, dt, mask=None):
+    """
+    advance the animation timers of every entity
+
+    returns two arrays of rows: rows that changed frame, and rows that
+    finished a ONCE animation.  the frame index of a finished animation is
+    left on the last frame.  if mask is passed, only those rows are advanced
+    """
+    n = world.count
+    timer = world.anim_timer[:n]
+    frame = world.anim_frame[:n]
+    length = world.anim_length[:n]
+    mode = world.anim_mode[:n]
+
+    running = (timer > 0) & ~world.anim_finished[:n]
+    if mask is not None:
+        running &= mask
+    timer[running] -= dt
+    due = running & (timer <= 0)
+    if not due.any():
+        empty = numpy.zeros(0, dtype=int)
+        return empty, empty
+
+    before = frame.copy()
+    frame[due] += 1
+    timer[due] = world.anim_ttl[:n][due]
+    ended = due & (frame >= length)
+
+    frame[ended & (mode == LOOP)] = 0
+    held = ended & (mode != LOOP)
+    frame[held] = length[held] - 1
+
+    finished = ended & (mode == ONCE)
+    world.anim_finished[:n] |= finished
+
+    changed = due & (frame != before)
+    return numpy.flatnonzero(changed), numpy.flatnonzero(finished)
+
+
+def find_dead(world):
+    """
+    return array of rows of every entity that is not alive
+    """
+    return numpy.flatnonzero(~world.alive[:world.count])
+
+
+def check_fallen(world, floor):
+    """
+    mark every entity that has fallen below the floor as dead
+    """
+    n = world.count
+    world.alive[:n] &= world.position[:n, 2] <= floor
+
+
+def in_view(world, low, high):
+    """
+    return bool array: True for each row whose bbox overlaps the box from
+    low to high, both (x, y, z)
+    """
+    n = world.count
+    position = world.position[:n]
+    far = position + world.size[:n]
+    return ((far >= low) & (position <= high)).all(axis=1)
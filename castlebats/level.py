@@ -0,0 +1,393 @@
+"""
+Compiled levels.
+
+Loading a .tmx map parses XML, decodes and inflates every tile layer, and
+cuts every tile image through pytmx.  A compiled level holds the same map,
+ready to use, in one file that is loaded with a single read:
+
+    magic, header length, JSON header, chunk records
+
+The header has the size of the level, the tilesets, the tile table, the
+named objects and the collision rects of the whole level.  Each entry of
+the tile table is the tileset and the rect of the tile in it, already
+worked out, and the flags of the tile.
+
+The tiles are split into square chunks.  Each chunk that has tiles or
+collision geometry in it has a compressed record with the tiles of every
+layer, as indices into the tile table, and the collision rects that
+overlap the chunk.  read_level puts the chunks back together; ChunkFile
+reads them one at a time, for streaming.
+
+Compile a level from the top of the project with:
+    python -m castlebats.level resources/level.tmx
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+import threading
+import zlib
+from collections import namedtuple
+
+import numpy
+import pygame
+import pytmx
+import pytmx.tmxloader
+import pyscroll
+
+
+MAGIC = b'CBLEVEL1'
+EXTENSION = '.lvl'
+CHUNK_SIZE = 16
+
+Chunk = namedtuple('Chunk', 'key, tiles, geometry')
+
+
+def level_path(tmx_path):
+    """
+    return the path of the compiled level for the .tmx map at tmx_path
+    """
+    return os.path.splitext(tmx_path)[0] + EXTENSION
+
+
+def is_current(path, tmx_path):
+    """
+    True if the compiled level at path exists and is not older than the map
+    """
+    return (os.path.exists(path) and
+            os.path.getmtime(path) >= os.path.getmtime(tmx_path))
+
+
+# =============================================================================
+# writing
+
+
+def write_level(tmx_path, path, chunk_size=CHUNK_SIZE):
+    """
+    compile the .tmx map at tmx_path to path
+
+    every object of the map is used as collision geometry, like the game
+    does with a map loaded with pytmx
+    """
+    tmx = pytmx.TiledMap(tmx_path)
+
+    # tile table: index -> (tileset, x, y, flags).  index 0 is no tile.  it
+    # follows the gids of pytmx
+    flags_of = {value[0]: value[1] for value in tmx.imagemap.values()
+                if value}
+    tilesets = sorted(tmx.tilesets, key=lambda ts: ts.firstgid)
+    tiles = [None]
+    for gid in range(1, tmx.maxgid):
+        tiled_gid = tmx.tiledgidmap[gid]
+        index = max(i for i, ts in enumerate(tilesets)
+                    if ts.firstgid <= tiled_gid)
+        ts = tilesets[index]
+        tile = tiled_gid - ts.firstgid
+        tw, th = ts.tilewidth, ts.tileheight
+        columns = (ts.width - ts.margin * 2 + ts.spacing) // (tw + ts.spacing)
+        x = ts.margin + tile % columns * (tw + ts.spacing)
+        y = ts.margin + tile // columns * (th + ts.spacing)
+        tiles.append((index, x, y, int(flags_of.get(gid, 0))))
+
+    layers = [layer for layer in tmx.visible_layers
+              if isinstance(layer, pytmx.TiledTileLayer)]
+    data = numpy.array([layer.data for layer in layers], dtype=numpy.uint16)
+
+    geometry = [(obj.x, obj.y, obj.width, obj.height) for obj in tmx.objects]
+    named = {obj.name: (obj.x, obj.y, obj.width, obj.height)
+             for obj in tmx.objects if obj.name}
+
+    header = {
+        'width': tmx.width,
+        'height': tmx.height,
+        'tilewidth': tmx.tilewidth,
+        'tileheight': tmx.tileheight,
+        'chunk_size': chunk_size,
+        'layers': [layer.name for layer in layers],
+        'tilesets': [{
+            'source': ts.source,
+            'trans': getattr(ts, 'trans', None),
+            'tilewidth': ts.tilewidth,
+            'tileheight': ts.tileheight,
+        } for ts in tilesets],
+        'tiles': tiles,
+        'objects': named,
+        'geometry': geometry,
+        'chunks': [],
+    }
+
+    pw = chunk_size * tmx.tilewidth
+    ph = chunk_size * tmx.tileheight
+    records = []
+    offset = 0
+    for cy in range(int(math.ceil(tmx.height / chunk_size))):
+        for cx in range(int(math.ceil(tmx.width / chunk_size))):
+            block = numpy.zeros((len(layers), chunk_size, chunk_size),
+                                dtype=numpy.uint16)
+            part = data[:, cy * chunk_size:(cy + 1) * chunk_size,
+                        cx * chunk_size:(cx + 1) * chunk_size]
+            block[:, :part.shape[1], :part.shape[2]] = part
+
+            area = pygame.Rect(cx * pw, cy * ph, pw, ph)
+            rects = numpy.array(
+                [rect for rect in geometry if area.colliderect(rect)],
+                dtype=numpy.float32).reshape(-1, 4)
+
+            if not block.any() and not len(rects):
+                continue
+
+            record = zlib.compress(block.tobytes() + rects.tobytes())
+            header['chunks'].append((cx, cy, offset, len(record), len(rects)))
+            records.append(record)
+            offset += len(record)
+
+    text = json.dumps(header).encode('utf-8')
+    with open(path, 'wb') as fp:
+        fp.write(MAGIC)
+        fp.write(struct.pack('<I', len(text)))
+        fp.write(text)
+        for record in records:
+            fp.write(record)
+
+
+# =============================================================================
+# reading
+
+
+def read_header(data, path=''):
+    """
+    return the header of a compiled level, and where the chunks start.
+    data is the start of the file, at least up to the end of the header
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('not a compiled level: {}'.format(path))
+    start = len(MAGIC) + 4
+    length, = struct.unpack('<I', data[len(MAGIC):start])
+    return json.loads(data[start:start + length].decode('utf-8')), \
+        start + length
+
+
+class LevelInfo:
+    """
+    Everything in the header of a compiled level
+    """
+
+    def __init__(self, header):
+        self.header = header
+        self.width = header['width']
+        self.height = header['height']
+        self.tilewidth = header['tilewidth']
+        self.tileheight = header['tileheight']
+        self.chunk_size = header['chunk_size']
+        self.layers = header['layers']
+        self.tilesets = header['tilesets']
+        self.tiles = header['tiles']
+        self.geometry = [tuple(rect) for rect in header['geometry']]
+        self.objects = {name: tuple(rect) for name, rect in
+                        header['objects'].items()}
+        self.chunks = {(cx, cy): (offset, length, count)
+                       for cx, cy, offset, length, count in header['chunks']}
+        self.columns = int(math.ceil(self.width / self.chunk_size))
+        self.rows = int(math.ceil(self.height / self.chunk_size))
+
+    def decode(self, key, record, count):
+        """
+        return the Chunk at key from its compressed record
+        """
+        size = self.chunk_size
+        shape = len(self.layers), size, size
+        record = zlib.decompress(record)
+        split = len(self.layers) * size * size * 2
+        tiles = numpy.frombuffer(record[:split], dtype=numpy.uint16)
+        geometry = numpy.frombuffer(record[split:], dtype=numpy.float32)
+        return Chunk(key, tiles.reshape(shape),
+                     geometry.reshape(count, 4).tolist())
+
+
+class Level(LevelInfo):
+    """
+    A compiled level, loaded all at once
+
+    data is an array of [layer, y, x] of indices into the tile table
+    """
+
+    def __init__(self, header, data):
+        super().__init__(header)
+        self.data = data
+
+
+def read_level(path):
+    """
+    load the compiled level at path with a single read
+    """
+    with open(path, 'rb') as fp:
+        blob = fp.read()
+
+    header, start = read_header(blob, path)
+    info = LevelInfo(header)
+    size = info.chunk_size
+    data = numpy.zeros((len(info.layers), info.rows * size,
+                        info.columns * size), dtype=numpy.uint16)
+    for (cx, cy), (offset, length, count) in info.chunks.items():
+        chunk = info.decode((cx, cy), blob[start + offset:
+                                           start + offset + length], count)
+        data[:, cy * size:(cy + 1) * size, cx * size:(cx + 1) * size] = \
+            chunk.tiles
+    return Level(header, data[:, :info.height, :info.width])
+
+
+class ChunkFile(LevelInfo):
+    """
+    A compiled level, read one chunk at a time
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fp = open(path, 'rb')
+        head = self._fp.read(len(MAGIC) + 4)
+        try:
+            length, = struct.unpack('<I', head[len(MAGIC):])
+            header, self._start = read_header(
+                head + self._fp.read(length), path)
+        except (ValueError, struct.error):
+            self._fp.close()
+            raise
+        super().__init__(header)
+
+    def close(self):
+        self._fp.close()
+
+    def read(self, key):
+        """
+        return the Chunk at key (cx, cy).  chunks with nothing in them have
+        no tiles and no geometry
+        """
+        try:
+            offset, length, count = self.chunks[key]
+        except KeyError:
+            return Chunk(key, None, ())
+
+        with self._lock:
+            self._fp.seek(self._start + offset)
+            record = self._fp.read(length)
+        return self.decode(key, record, count)
+
+
+class TileImages:
+    """
+    Tile images of a compiled level, cut from the tilesets when first used
+    """
+
+    def __init__(self, level, directory):
+        self.level = level
+        self.directory = directory
+        self.sheets = [None] * len(level.tilesets)
+        self.images = [None] * len(level.tiles)
+
+    def __len__(self):
+        return len(self.images)
+
+    def __getitem__(self, index):
+        image = self.images[index]
+        if image is None and index:
+            image = self.images[index] = self._cut(index)
+        return image
+
+    def _cut(self, index):
+        # the same steps as the pytmx loader, so tiles look the same
+        tileset, x, y, flags = self.level.tiles[index]
+        ts = self.level.tilesets[tileset]
+        sheet = self.sheets[tileset]
+        if sheet is None:
+            from castlebats.assets import cache
+            sheet = cache.image(os.path.join(self.directory, ts['source']))
+            self.sheets[tileset] = sheet
+
+        image = sheet.subsurface((x, y, ts['tilewidth'], ts['tileheight']))
+        colorkey = ts['trans']
+        if colorkey:
+            colorkey = pygame.Color('#{0}'.format(colorkey))
+        image = pytmx.tmxloader.handle_transformation(image, flags)
+        return pytmx.tmxloader.smart_convert(image, colorkey, False)
+
+
+# =============================================================================
+# drawing
+
+
+class LevelMapData:
+    """
+    pyscroll map data for a Level
+    """
+
+    def __init__(self, level, images):
+        self.level = level
+        self.images = images
+
+    @property
+    def tilewidth(self):
+        return self.level.tilewidth
+
+    @property
+    def tileheight(self):
+        return self.level.tileheight
+
+    @property
+    def width(self):
+        return self.level.width
+
+    @property
+    def height(self):
+        return self.level.height
+
+    @property
+    def visible_layers(self):
+        return iter(range(len(self.level.layers)))
+
+    @property
+    def visible_tile_layers(self):
+        return iter(range(len(self.level.layers)))
+
+    @property
+    def visible_object_layers(self):
+        return iter(())
+
+    def get_tile_image(self, position):
+        x, y, l = position
+        if not (0 <= x < self.level.width and 0 <= y < self.level.height):
+            raise ValueError
+        return self.images[int(self.level.data[l, y, x])]
+
+
+class LevelRenderer(pyscroll.BufferedRenderer):
+    """
+    BufferedRenderer for compiled levels
+
+    compiled levels keep their objects only as collision geometry, so there
+    are no object layers to draw
+    """
+
+    def draw_objects(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compile .tmx maps to levels that load quickly')
+    parser.add_argument('maps', nargs='+', help='.tmx files to compile')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help='tiles along each side of a chunk')
+    args = parser.parse_args()
+
+    for tmx_path in args.maps:
+        path = level_path(tmx_path)
+        write_level(tmx_path, path, args.chunk_size)
+        print('{} -> {} ({:.1f} KiB)'.format(
+            tmx_path, path, os.path.getsize(path) / 1024))
+
+
+if __name__ == '__main__':
+    main()
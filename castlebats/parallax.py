@@ -0,0 +1,170 @@
+"""
+Parallax backgrounds.
+
+Each layer is an image repeated sideways that scrolls at a fraction of the
+camera speed.  Layers are drawn back to front into one cached surface,
+which is only drawn again when the whole-pixel offset of a layer changes,
+or when a layer is hidden or shown.
+
+A layer is skipped when the part of the screen it covers is also covered
+by opaque map tiles, since the map is drawn over the background.
+"""
+
+import math
+
+import numpy
+import pygame
+
+
+def opaque_tiles(images, layers, colorkey=(0, 0, 0)):
+    """
+    return bool array of [y, x]: True where one of the layers has a tile
+    that hides what is under it
+
+    images are the tile images by gid, and layers are the gids of the
+    visible tile layers of the map, as [y, x].  colorkey is the colorkey of
+    the map buffer; pixels of that color are not drawn, so tiles that have
+    them are not opaque
+    """
+    opaque = numpy.zeros(len(images), dtype=bool)
+    for gid in range(len(images)):
+        image = images[gid]
+        if image is None:
+            continue
+        w, h = image.get_size()
+        if pygame.mask.from_surface(image).count() < w * h:
+            continue
+        if pygame.mask.from_threshold(image, colorkey, (1, 1, 1, 255)).count():
+            continue
+        opaque[gid] = True
+
+    covered = None
+    for gids in layers:
+        layer = opaque[numpy.asarray(gids, dtype=int)]
+        covered = layer if covered is None else covered | layer
+    return covered
+
+
+class ParallaxLayer:
+    """
+    One image repeated sideways
+
+    factor:    (x, y) fraction of the camera movement the layer scrolls by.
+               0 does not scroll; 1 scrolls with the map
+    position:  where the top left of the image is when the camera is at 0, 0
+    colorkey:  color to leave out, or None if the image is opaque
+    """
+
+    def __init__(self, image, factor, position=(0, 0), colorkey=None):
+        self.image = image
+        self.factor = factor
+        self.position = position
+        self.colorkey = colorkey
+        self.strip = None
+
+    def build(self, width):
+        """
+        make the strip: enough copies of the image side by side to cover
+        width from any offset, in the display format
+        """
+        w, h = self.image.get_size()
+        count = int(math.ceil(width / w)) + 1
+        strip = pygame.Surface((w * count, h))
+        for i in range(count):
+            strip.blit(self.image, (i * w, 0))
+        strip = strip.convert()
+        if self.colorkey is not None:
+            strip.set_colorkey(self.colorkey, pygame.RLEACCEL)
+        self.strip = strip
+
+    def offset(self, left, top):
+        """
+        return the whole-pixel scroll of the strip and the y it is drawn at,
+        for a view with a top left corner of left, top
+        """
+        fx, fy = self.factor
+        x, y = self.position
+        scroll = int(left * fx - x) % self.image.get_width()
+        return scroll, int(y - top * fy)
+
+
+class Parallax:
+    """
+    Layers of background, drawn back to front
+
+    covered and tile_size come from opaque_tiles and the map; if they are
+    given, layers hidden by the map are skipped.
+    """
+
+    def __init__(self, layers, covered=None, tile_size=(16, 16),
+                 background=(0, 0, 0)):
+        self.layers = layers
+        self.covered = covered
+        self.tile_size = tile_size
+        self.background = background
+        self.size = None
+        self.surface = None
+        self.drawn = None
+        self.redraws = 0
+
+    def set_size(self, size):
+        """
+        make the strips and cached surface again for a view of size
+
+        also used to convert to a new display format
+        """
+        self.size = size
+        self.surface = pygame.Surface(size).convert()
+        self.drawn = None
+        for layer in self.layers:
+            layer.build(size[0])
+
+    def is_covered(self, left, top, y, height):
+        """
+        True if the band of the view from y to y + height is all behind
+        opaque map tiles
+        """
+        if self.covered is None:
+            return False
+
+        y0 = max(y, 0)
+        y1 = min(y + height, self.size[1])
+        if y1 <= y0:
+            return True
+
+        tw, th = self.tile_size
+        rows, columns = self.covered.shape
+        x0 = int(math.floor(left / tw))
+        x1 = int(math.ceil((left + self.size[0]) / tw))
+        r0 = int(math.floor((top + y0) / th))
+        r1 = int(math.ceil((top + y1) / th))
+        if x0 < 0 or r0 < 0 or x1 > columns or r1 > rows:
+            return False
+        return bool(self.covered[r0:r1, x0:x1].all())
+
+    def draw(self, surface, view):
+        """
+        draw the background for the view, a position of the top left of
+        the view in map pixels
+        """
+        left, top = view
+        state = []
+        for layer in self.layers:
+            scroll, y = layer.offset(left, top)
+            if self.is_covered(left, top, y, layer.image.get_height()):
+                state.append(None)
+            else:
+                state.append((scroll, y))
+
+        if state != self.drawn:
+            self.drawn = state
+            self.redraws += 1
+            cache = self.surface
+            cache.fill(self.background)
+            width, height = self.size
+            for layer, offset in zip(self.layers, state):
+                if offset is not None:
+                    scroll, y = offset
+                    cache.blit(layer.strip, (0, y), (scroll, 0, width, height))
+
+        surface.blit(self.surface, (0, 0))
@@ -0,0 +1,84 @@
+"""
+Pools of actors that are spawned over and over.
+
+Making an actor makes its body, its bounding box and its vectors.  Actors
+like bats are spawned all through the game and live for a few seconds, so
+instead of making a new one each time, a removed actor is kept in a pool
+and given out again for the next spawn.
+
+The pool does not reset actors.  The Game calls spawn on every actor it
+adds, which resets the actor's body, animation and state and gives it a
+new entity in the World, so a reused actor starts like a new one.
+"""
+
+import weakref
+
+
+class ActorPool:
+    """
+    Reuse actors that have been removed from the game
+
+    factory:  called with no arguments to make a new actor, when the pool
+              is empty
+    size:     most actors kept in the pool; actors released to a full pool
+              are dropped
+    name:     shown in the report
+
+    release an actor only after it has been removed from the game.  actors
+    given out are weakly referenced, so an actor that is acquired and then
+    thrown away without being added is no longer counted as in use.
+
+    usage:
+        bats = ActorPool(lambda: Bat(world), size=32, name='bat')
+        bat = bats.acquire()
+        ...
+        bats.release(bat)
+    """
+
+    def __init__(self, factory, size=32, name='actor'):
+        self.factory = factory
+        self.size = size
+        self.name = name
+        self.free = []
+        self.out = weakref.WeakSet()
+        self.high_water = 0
+        self.created = 0
+        self.reused = 0
+        self.dropped = 0
+
+    def acquire(self):
+        """
+        return an actor, to be positioned and added to the game
+        """
+        if self.free:
+            actor = self.free.pop()
+            self.reused += 1
+        else:
+            actor = self.factory()
+            self.created += 1
+        self.out.add(actor)
+        self.high_water = max(self.high_water, len(self.out))
+        return actor
+
+    def release(self, actor):
+        """
+        give back an actor that was removed from the game
+        """
+        if actor not in self.out:
+            raise ValueError('{} was not given out by the {} pool'.format(
+                actor, self.name))
+        self.out.remove(actor)
+        if len(self.free) < self.size:
+            self.free.append(actor)
+        else:
+            self.dropped += 1
+
+    @property
+    def in_use(self):
+        return len(self.out)
+
+    def report(self):
+        return ('{} pool: {} in use ({} high water)  {} free/{}  '
+                'created: {}  reused: {}  dropped: {}'.format(
+                    self.name, self.in_use, self.high_water, len(self.free),
+                    self.size, self.created, self.reused, self.dropped))
@@ -0,0 +1,129 @@
+"""
+Presentation stage: scale the game buffer up to the screen.
+
+The game is drawn into a small buffer, which is scaled up to the screen.
+When the scale is a whole number, the buffer is made the size of the screen
+divided by the scale, rounded down.  The buffer then maps onto the screen
+exactly, and the space left over is filled with a border.  Scaling by a
+whole number with transform.scale is cheaper than scaling by any other
+ratio, and the pixels stay square.
+
+The layout is only worked out again when the size of the screen changes.
+"""
+
+import pygame
+
+
+class Presenter:
+    """
+    Scale a buffer to the screen by a whole number when possible
+
+    scale:       screen pixels for each buffer pixel, at a zoom of 1
+    zoom:        camera zoom; multiplies scale.  when scale * zoom is not a
+                 whole number the buffer fills the screen at any ratio, with
+                 no border
+    background:  color of the border
+
+    usage:
+        presenter = Presenter(2)
+        while running:
+            if presenter.layout(screen):
+                buffer = pygame.Surface(presenter.buffer_size)
+            draw(buffer)
+            presenter.present(buffer, screen)
+    """
+
+    def __init__(self, scale=2, zoom=1, background=(0, 0, 0)):
+        self.scale = scale
+        self.zoom = zoom
+        self.background = background
+        self.output = None
+        self.output_size = None
+        self.buffer_size = None
+        self.rect = None
+        self.target = None
+
+    @property
+    def factor(self):
+        return self.scale * self.zoom
+
+    @property
+    def integer(self):
+        """
+        True if the buffer is scaled by a whole number
+        """
+        return self.factor == int(self.factor)
+
+    def set_zoom(self, zoom):
+        self.zoom = zoom
+        self.output_size = None
+
+    def layout(self, surface):
+        """
+        work out the buffer size and where it goes on surface
+
+        returns True if the layout changed.  the buffer should then be made
+        again with buffer_size, and drawn in full
+        """
+        size = surface.get_size()
+        if surface is self.output and size == self.output_size:
+            return False
+
+        factor = self.factor
+        width, height = size
+        if self.integer:
+            factor = int(factor)
+            buffer_size = max(1, width // factor), max(1, height // factor)
+            scaled = buffer_size[0] * factor, buffer_size[1] * factor
+            rect = pygame.Rect((0, 0), scaled)
+            rect.center = surface.get_rect().center
+        else:
+            buffer_size = (max(1, int(round(width / factor))),
+                           max(1, int(round(height / factor))))
+            rect = surface.get_rect()
+
+        # the scaled buffer is written straight onto the screen, through a
+        # subsurface that is kept for as long as the layout is
+        if rect == surface.get_rect():
+            self.target = surface
+        else:
+            surface.fill(self.background)
+            self.target = surface.subsurface(rect)
+
+        self.output = surface
+        self.output_size = size
+        self.buffer_size = buffer_size
+        self.rect = rect
+        return True
+
+    def present(self, buffer, surface):
+        """
+        scale all of buffer to surface
+        """
+        self.layout(surface)
+        if self.rect.size == buffer.get_size():
+            self.target.blit(buffer, (0, 0))
+        else:
+            pygame.transform.scale(buffer, self.rect.size, self.target)
+
+    def present_rects(self, buffer, surface, rects):
+        """
+        scale only rects of buffer to surface
+
+        only possible when the buffer is scaled by a whole number.  returns
+        the rects of surface that were changed
+        """
+        self.layout(surface)
+        factor = int(self.factor)
+        left, top = self.rect.topleft
+        updates = []
+        for rect in rects:
+            target = pygame.Rect(rect.x * factor, rect.y * factor,
+                                 rect.w * factor, rect.h * factor)
+            if factor == 1:
+                self.target.blit(buffer, target, rect)
+            else:
+                pygame.transform.scale(buffer.subsurface(rect), target.size,
+                                       self.target.subsurface(target))
+            updates.append(target.move(left, top))
+        return updates
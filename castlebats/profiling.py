@@ -0,0 +1,409 @@
+"""
+Opt-in profiling tools.
+
+AllocationProfiler uses tracemalloc to take a snapshot at the end of every
+frame and compares it to the one before, so memory allocated and kept during
+the frame can be attributed to subsystems.  The source lines that kept the
+most memory are found by comparing the last snapshot with the one taken
+when the profiler was started, just before the game loop.  Memory allocated
+while a module is imported is left out of both.
+
+tracemalloc only knows about memory that is still in use, so short lived
+temporaries never show up in a snapshot, and so never in the subsystems or
+the lines of the report.  They only appear as the peak memory used while a
+section of the frame runs, above what was in use when the section started.
+The number of garbage collections is also recorded.
+
+Tracing allocations is slow; only enable the profiler when looking for
+allocations.
+
+StartupProfiler times the imports and each step of initialisation, up to
+the first frame drawn.
+"""
+
+import builtins
+import gc
+import contextlib
+import functools
+import importlib.util
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+
+class AllocationProfiler:
+    """
+    Track allocations frame by frame and attribute them to subsystems
+
+    Subsystems are registered with a name and any number of targets.  A
+    target is a path to a source file (or directory) or a function.  Each
+    allocation is attributed to the first subsystem that matches a frame of
+    its traceback, starting from the frame that made the allocation.
+
+    Parts of the frame can be wrapped in a section to measure the temporary
+    memory they use.  The peak of a section includes the sections inside
+    it, and a section entered more than once in a frame adds up the peak of
+    each time.  The peaks are read from the whole process, so only sections
+    on the thread that started the profiler are measured; the others are
+    ignored.
+
+    usage:
+        profiler = AllocationProfiler()
+        profiler.register('physics', 'physics/physicsgroup.py')
+        profiler.register('draw', Game.draw)
+        profiler.start()
+        while running:
+            with profiler.section('physics'):
+                ...
+            profiler.end_frame()
+        profiler.dump()
+    """
+
+    def __init__(self, nframes=8, top=10):
+        self.nframes = nframes
+        self.top = top
+        self.rules = []
+        self.running = False
+        self.first = None
+        self.previous = None
+        self.thread = None
+        self.frames = 0
+        self.collections = 0
+        self.peak_total = 0
+        self.peak_max = 0
+        self.frame_start = 0
+        self.frame_peak = 0
+        self.section_peak = defaultdict(int)
+        self.sections = []
+        self.subsystem_size = defaultdict(int)
+        self.subsystem_count = defaultdict(int)
+        self._filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<unknown>'),
+            # anything allocated while importing a module
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>',
+                               all_frames=True),
+            tracemalloc.Filter(False,
+                               '<frozen importlib._bootstrap_external>',
+                               all_frames=True),
+        ]
+
+    def register(self, name, *targets):
+        """
+        register a subsystem
+
+        targets may be paths to source files or directories, or functions
+        """
+        for target in targets:
+            code = getattr(target, '__code__', None)
+            if code is None:
+                path = os.path.abspath(target)
+                self.rules.append((name, path, None, None))
+            else:
+                lines = [l for s, e, l in code.co_lines() if l is not None]
+                first = min(lines + [code.co_firstlineno])
+                last = max(lines + [code.co_firstlineno])
+                path = os.path.abspath(code.co_filename)
+                self.rules.append((name, path, first, last))
+
+    def start(self):
+        if self.running:
+            return
+        tracemalloc.start(self.nframes)
+        gc.callbacks.append(self._gc_callback)
+        self.thread = threading.get_ident()
+        self.previous = self.first = self._snapshot()
+        self.frame_start = self._read_peak()[0]
+        self.frame_peak = 0
+        self.running = True
+
+    def stop(self):
+        if not self.running:
+            return
+        gc.callbacks.remove(self._gc_callback)
+        tracemalloc.stop()
+        self.previous = self.first = None
+        del self.sections[:]
+        self.running = False
+
+    def _gc_callback(self, phase, info):
+        if phase == 'start':
+            self.collections += 1
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self._filters)
+
+    def _read_peak(self):
+        # the peak is reset each time it is read, so it is also given to
+        # every open section
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        self.frame_peak = max(self.frame_peak, peak - self.frame_start)
+        for section in self.sections:
+            section[2] = max(section[2], peak - section[1])
+        return current, peak
+
+    @contextlib.contextmanager
+    def section(self, name):
+        """
+        measure the temporary memory used by the code in the block
+        """
+        if not self.running or threading.get_ident() != self.thread:
+            yield
+            return
+
+        section = [name, self._read_peak()[0], 0]
+        self.sections.append(section)
+        try:
+            yield
+        finally:
+            if self.running:
+                self._read_peak()
+                self.sections.pop()
+                self.section_peak[name] += section[2]
+
+    def wrap(self, name, function):
+        """
+        return function changed to run in a section each time it is called
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.section(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    def classify(self, traceback):
+        """
+        return name of the subsystem a traceback belongs to
+        """
+        # tracebacks are stored with the most recent frame last
+        for frame in reversed(traceback):
+            filename = os.path.abspath(frame.filename)
+            for name, path, first, last in self.rules:
+                if first is None:
+                    if filename == path or filename.startswith(path + os.sep):
+                        return name
+                elif filename == path and first <= frame.lineno <= last:
+                    return name
+        return 'other'
+
+    def end_frame(self):
+        """
+        compare the memory at the end of this frame with the last one
+        """
+        if not self.running or threading.get_ident() != self.thread:
+            return
+
+        self._read_peak()
+        snapshot = self._snapshot()
+        self.frames += 1
+        self.peak_total += self.frame_peak
+        self.peak_max = max(self.peak_max, self.frame_peak)
+
+        for stat in snapshot.compare_to(self.previous, 'traceback'):
+            if stat.size_diff <= 0:
+                continue
+            traceback = stat.traceback
+            name = self.classify(traceback)
+            self.subsystem_size[name] += stat.size_diff
+            self.subsystem_count[name] += max(stat.count_diff, 0)
+
+        self.previous = snapshot
+        self.frame_start = self._read_peak()[0]
+        self.frame_peak = 0
+
+    def report(self):
+        """
+        return the collected statistics as text
+        """
+        frames = max(self.frames, 1)
+        lines = [
+            'allocation profile: {} frames'.format(self.frames),
+            '  frame peak: {:.1f} KiB avg, {:.1f} KiB max'.format(
+                self.peak_total / frames / 1024, self.peak_max / 1024),
+            '  gc collections: {}'.format(self.collections),
+            '',
+            '  {:<12} {:>15}'.format('section', 'temp bytes/frame'),
+        ]
+
+        for name, size in sorted(self.section_peak.items(),
+                                 key=lambda i: i[1], reverse=True):
+            lines.append('  {:<12} {:>15.1f}'.format(name, size / frames))
+
+        lines.append('')
+        lines.append('  {:<12} {:>15} {:>15}'.format(
+            'subsystem', 'kept bytes/frame', 'kept blocks/frame'))
+        for name, size in sorted(self.subsystem_size.items(),
+                                 key=lambda i: i[1], reverse=True):
+            lines.append('  {:<12} {:>15.1f} {:>15.1f}'.format(
+                name, size / frames, self.subsystem_count[name] / frames))
+
+        lines.append('')
+        lines.append('  top {} lines by memory kept:'.format(self.top))
+        if self.first is not None:
+            stats = self.previous.compare_to(self.first, 'lineno')
+            ranked = [stat for stat in stats if stat.size_diff > 0]
+            for stat in ranked[:self.top]:
+                frame = stat.traceback[0]
+                lines.append(
+                    '  {:>10.1f} B/frame {:>8.1f} blocks/frame  {}:{}'.format(
+                        stat.size_diff / frames, stat.count_diff / frames,
+                        os.path.relpath(frame.filename), frame.lineno))
+
+        return '\n'.join(lines)
+
+    def dump(self, stream=None, reset=False):
+        """
+        write the report to a stream (stderr by default)
+
+        can be called while the game is running.  if reset is True, the
+        statistics are cleared afterwards.
+        """
+        if stream is None:
+            stream = sys.stderr
+        stream.write('{}\n{}\n\n'.format(time.strftime('%X'), self.report()))
+        stream.flush()
+        if reset:
+            self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.collections = 0
+        self.peak_total = 0
+        self.peak_max = 0
+        self.section_peak.clear()
+        self.subsystem_size.clear()
+        self.subsystem_count.clear()
+        self.first = self.previous
+
+
+class StartupProfiler:
+    """
+    Time imports and initialisation up to the first frame
+
+    While running, every import that loads a new module is timed.  The time
+    is credited to the first module it loaded, without the time of the
+    imports made while loading it, like python -X importtime.  Steps of
+    initialisation are timed with step.
+
+    usage:
+        startup = StartupProfiler()
+        startup.start()
+        import pygame
+        with startup.step('display'):
+            screen = pygame.display.set_mode(size)
+        draw(screen)
+        startup.first_frame()
+        print(startup.report())
+    """
+
+    def __init__(self, top=15):
+        self.top = top
+        self.running = False
+        self.started = time.perf_counter()
+        self.first_frame_time = None
+        self.imports = []
+        self.steps = []
+        self._import = None
+        self._stack = []
+
+    def start(self):
+        if self.running:
+            return
+        self._import = builtins.__import__
+        builtins.__import__ = self._timed_import
+        self.running = True
+
+    def stop(self):
+        if not self.running:
+            return
+        builtins.__import__ = self._import
+        self.running = False
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(),
+                      level=0):
+        # the modules this import may load: the one named, and any
+        # submodules named by "from ... import"
+        module = name
+        if level:
+            try:
+                module = importlib.util.resolve_name(
+                    '.' * level + name, globals.get('__package__'))
+            except (AttributeError, ImportError, ValueError):
+                pass
+        names = [module] + ['{}.{}'.format(module, item).strip('.')
+                            for item in fromlist or () if item != '*']
+        new = [i for i in names if i not in sys.modules]
+
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            loaded = [i for i in new if i in sys.modules]
+            if loaded:
+                self.imports.append((loaded[0], elapsed - children, elapsed))
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """
+        time the code in the block as a step of initialisation
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - start))
+
+    def first_frame(self):
+        """
+        mark the first frame as drawn, and stop timing imports
+        """
+        if self.first_frame_time is None:
+            self.first_frame_time = time.perf_counter() - self.started
+            self.stop()
+
+    def report(self):
+        """
+        return the collected times as text
+        """
+        imported = sum(own for module, own, total in self.imports)
+        lines = [
+            'startup profile: {} modules imported'.format(len(self.imports)),
+            '',
+            '  {:<40} {:>9} {:>9}'.format('import', 'self ms', 'total ms'),
+        ]
+        ranked = sorted(self.imports, key=lambda i: i[2], reverse=True)
+        for module, own, total in ranked[:self.top]:
+            lines.append('  {:<40} {:>9.1f} {:>9.1f}'.format(
+                module, own * 1000, total * 1000))
+        lines.append('  {:<40} {:>9.1f}'.format('all imports',
+                                                imported * 1000))
+
+        lines.append('')
+        lines.append('  {:<40} {:>9}'.format('step', 'ms'))
+        for name, elapsed in self.steps:
+            lines.append('  {:<40} {:>9.1f}'.format(name, elapsed * 1000))
+
+        if self.first_frame_time is not None:
+            lines.append('')
+            lines.append('  time to first frame: {:.1f} ms'.format(
+                self.first_frame_time * 1000))
+        return '\n'.join(lines)
+
+    def dump(self, stream=None):
+        """
+        write the report to a stream (stderr by default)
+        """
+        if stream is None:
+            stream = sys.stderr
+        stream.write('{}\n\n'.format(self.report()))
+        stream.flush()
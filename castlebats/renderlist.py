@@ -0,0 +1,87 @@
+"""
+Retained list of sprites to draw.
+
+Each actor that is drawn owns a RenderRecord, which is kept from frame to
+frame and only changed when the actor moves or changes frame.  Records are
+lists of (surface, rect, layer, anchor), so the RenderList can be passed
+straight to BufferedRenderer.draw without building a new list of tuples
+every frame.  The RenderList is kept sorted by layer as records are added
+or moved to another layer.
+"""
+
+import bisect
+from operator import itemgetter
+
+import pygame
+
+
+class RenderRecord(list):
+    """
+    [surface, rect, layer, anchor] of one sprite
+
+    anchor is the point of the surface that is placed on the position of
+    the actor.  change the layer only through RenderList.set_layer.
+    """
+
+    __slots__ = ['stamp']
+
+    surface = property(itemgetter(0))
+    rect = property(itemgetter(1))
+    layer = property(itemgetter(2))
+    anchor = property(itemgetter(3))
+
+    def __init__(self, surface, layer=0, anchor=(0, 0)):
+        super().__init__((surface, pygame.Rect((0, 0), surface.get_size()),
+                          layer, anchor))
+        self.stamp = 0
+
+    def update(self, surface, ax, ay, x, y):
+        """
+        place the anchor (ax, ay) of surface at x, y
+
+        returns True if the record changed
+        """
+        left = int(x - ax)
+        top = int(y - ay)
+        rect = self[1]
+        if surface is self[0] and left == rect.x and top == rect.y:
+            return False
+
+        if surface is not self[0]:
+            self[0] = surface
+            self[3] = ax, ay
+            rect.size = surface.get_size()
+        rect.x = left
+        rect.y = top
+        return True
+
+
+def _layer(record):
+    return record[2]
+
+
+class RenderList(list):
+    """
+    RenderRecords sorted by layer
+
+    records on the same layer are drawn in the order they were added
+    """
+
+    __slots__ = []
+
+    def add(self, record):
+        bisect.insort_right(self, record, key=_layer)
+
+    def remove(self, record):
+        # records are lists, so compare by identity and not by value
+        for index, other in enumerate(self):
+            if other is record:
+                del self[index]
+                return
+        raise ValueError('record not in list')
+
+    def set_layer(self, record, layer):
+        if record[2] != layer:
+            self.remove(record)
+            record[2] = layer
+            self.add(record)
@@ -0,0 +1,173 @@
+"""
+Frame pacing for the main loop.
+
+The FrameScheduler runs the simulation at a fixed tick rate and draws at
+most once per frame.  It measures how long updates and draws take, and when
+the simulation falls behind, drawing is skipped so the tick rate can be held
+on slow hardware.  The rest of each frame is spent sleeping.
+
+usage:
+    scheduler = FrameScheduler(40, 180)
+    scheduler.start()
+    while running:
+        handle_input()
+        for tick in scheduler.ticks():
+            update()
+        if scheduler.should_draw():
+            with scheduler.drawing():
+                draw()
+        scheduler.end_frame()
+"""
+
+import contextlib
+import time
+
+
+class FrameScheduler:
+    """
+    Fixed tick rate scheduler with a frame budget and draw skipping
+
+    frame_rate:  frames per second; 1 / frame_rate is the frame budget
+    tick_rate:   simulation ticks per second, or None to only pace draws
+    max_ticks:   most ticks run in one frame.  time beyond that is dropped
+    max_skip:    most draws skipped in a row, so the screen still updates
+    spin:        seconds before the deadline to stop sleeping and spin,
+                 since sleep is not precise on every platform
+    """
+
+    def __init__(self, frame_rate, tick_rate=None, max_ticks=None,
+                 max_skip=4, spin=0.002, smoothing=0.1):
+        self.frame_time = 1.0 / frame_rate
+        self.tick_time = None
+        self.max_ticks = max_ticks
+        if tick_rate:
+            self.tick_time = 1.0 / tick_rate
+            if max_ticks is None:
+                self.max_ticks = max(1, int(tick_rate / frame_rate) * 2)
+        self.max_skip = max_skip
+        self.spin = spin
+        self.smoothing = smoothing
+
+        self.lag = 0.0
+        self.last = None
+        self.deadline = None
+        self.skipped_in_row = 0
+
+        # running averages, in seconds
+        self.update_time = 0.0
+        self.draw_time = 0.0
+
+        # counters
+        self.frames = 0
+        self.tick_count = 0
+        self.draws = 0
+        self.skipped_draws = 0
+        self.dropped_ticks = 0
+        self.missed_deadlines = 0
+
+    def start(self):
+        now = time.perf_counter()
+        self.last = now
+        self.deadline = now + self.frame_time
+        self.lag = 0.0
+
+    def _average(self, average, value):
+        return average + (value - average) * self.smoothing
+
+    def ticks(self):
+        """
+        yield once for every simulation tick that is due
+
+        the time taken between each yield is measured as update time
+        """
+        if self.tick_time is None:
+            return
+
+        now = time.perf_counter()
+        self.lag += now - self.last
+        self.last = now
+
+        count = 0
+        while self.lag >= self.tick_time:
+            if count == self.max_ticks:
+                # cannot catch up in this frame; drop the extra time
+                dropped = int(self.lag / self.tick_time)
+                self.dropped_ticks += dropped
+                self.lag -= dropped * self.tick_time
+                break
+
+            start = time.perf_counter()
+            yield count
+            self.update_time = self._average(self.update_time,
+                                             time.perf_counter() - start)
+            self.lag -= self.tick_time
+            self.tick_count += 1
+            count += 1
+
+    @property
+    def behind(self):
+        """
+        True if a draw now would miss the end of the frame
+
+        ticks() always leaves less than one tick of lag, so waiting ticks
+        are not checked here
+        """
+        return time.perf_counter() + self.draw_time > self.deadline
+
+    def should_draw(self):
+        """
+        return True if this frame should be drawn
+
+        draws are skipped while the simulation is behind, but never more than
+        max_skip in a row
+        """
+        if self.behind and self.skipped_in_row < self.max_skip:
+            self.skipped_in_row += 1
+            self.skipped_draws += 1
+            return False
+
+        self.skipped_in_row = 0
+        return True
+
+    @contextlib.contextmanager
+    def drawing(self):
+        """
+        measure the time taken to draw
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.draw_time = self._average(self.draw_time,
+                                           time.perf_counter() - start)
+            self.draws += 1
+
+    def end_frame(self):
+        """
+        wait for the rest of the frame
+        """
+        now = time.perf_counter()
+        self.frames += 1
+
+        if now > self.deadline:
+            self.missed_deadlines += 1
+            # start again from now instead of rushing to catch up
+            self.deadline = now + self.frame_time
+            return
+
+        remaining = self.deadline - now - self.spin
+        if remaining > 0:
+            time.sleep(remaining)
+        while time.perf_counter() < self.deadline:
+            pass
+
+        self.deadline += self.frame_time
+
+    def report(self):
+        return ('frames: {}  draws: {}  skipped draws: {}  missed deadlines: {}'
+                '\nticks: {}  dropped ticks: {}'
+                '\nupdate: {:.2f} ms  draw: {:.2f} ms  budget: {:.2f} ms'
+                .format(self.frames, self.draws, self.skipped_draws,
+                        self.missed_deadlines, self.tick_count,
+                        self.dropped_ticks, self.update_time * 1000,
+                        self.draw_time * 1000, self.frame_time * 1000))
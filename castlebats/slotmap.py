@@ -0,0 +1,115 @@
+"""
+Slot map: store objects under generational integer handles.
+
+A handle is a slot index with a generation number in the high bits.  When a
+value is removed, the generation of its slot is increased, so old handles to
+that slot no longer match and can be detected, even after the slot is used
+again.  Adding, removing and looking up values are all O(1).
+
+Values are also kept in a packed list, so iterating over them does not have
+to skip empty slots.
+"""
+
+INDEX_BITS = 24
+INDEX_MASK = (1 << INDEX_BITS) - 1
+
+
+class SlotMap:
+    """
+    Container of values with generational handles
+
+    Looking up or removing a value with a handle that was already removed
+    raises KeyError.
+    """
+
+    __slots__ = ['_generations', '_dense_index', '_free', '_values',
+                 '_handles']
+
+    def __init__(self):
+        self._generations = []      # slot -> generation
+        self._dense_index = []      # slot -> position in _values, -1 if free
+        self._free = []
+        self._values = []
+        self._handles = []
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __contains__(self, handle):
+        # None is the handle of something that was never added
+        if not isinstance(handle, int):
+            return False
+        try:
+            self._slot(handle)
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, handle):
+        return self._values[self._dense_index[self._slot(handle)]]
+
+    def __setitem__(self, handle, value):
+        self._values[self._dense_index[self._slot(handle)]] = value
+
+    def get(self, handle, default=None):
+        try:
+            return self[handle]
+        except KeyError:
+            return default
+
+    def handles(self):
+        return iter(self._handles)
+
+    def items(self):
+        return zip(self._handles, self._values)
+
+    def _slot(self, handle):
+        slot = handle & INDEX_MASK
+        if (slot >= len(self._generations) or
+                self._generations[slot] != handle >> INDEX_BITS or
+                self._dense_index[slot] < 0):
+            raise KeyError(handle)
+        return slot
+
+    def insert(self, value):
+        """
+        add a value and return its handle
+        """
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._generations)
+            if slot > INDEX_MASK:
+                raise OverflowError('slot map is full')
+            self._generations.append(0)
+            self._dense_index.append(-1)
+
+        handle = self._generations[slot] << INDEX_BITS | slot
+        self._dense_index[slot] = len(self._values)
+        self._values.append(value)
+        self._handles.append(handle)
+        return handle
+
+    def remove(self, handle):
+        """
+        remove the value of a handle and return it
+        """
+        slot = self._slot(handle)
+        index = self._dense_index[slot]
+
+        # move the last value into the hole to keep the list packed
+        value = self._values[index]
+        last_value = self._values.pop()
+        last_handle = self._handles.pop()
+        if index < len(self._values):
+            self._values[index] = last_value
+            self._handles[index] = last_handle
+            self._dense_index[last_handle & INDEX_MASK] = index
+
+        self._dense_index[slot] = -1
+        self._generations[slot] += 1
+        self._free.append(slot)
+        return value
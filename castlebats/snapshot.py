@@ -0,0 +1,34 @@
+"""
+Immutable snapshots of the game state, for drawing.
+
+The simulation publishes a new snapshot at the end of every tick.  The
+renderer only reads the latest snapshot, so it never touches the actors
+while the simulation is changing them and no locks are needed.
+"""
+
+from collections import namedtuple
+
+
+# handle is the actor's handle in Game.actors.  image and axis are the
+# current animation frame; bbox is a plain tuple
+ActorState = namedtuple('ActorState', 'handle, image, bbox, axis, layer')
+
+Snapshot = namedtuple('Snapshot', 'tick, camera, hero, actors')
+
+
+class SnapshotBuffer:
+    """
+    Holds the latest published snapshot
+
+    Snapshots are never changed once published, and publishing one is a
+    single assignment, so a reader always gets a complete snapshot without
+    locking.  Older snapshots are dropped as soon as no reader holds them.
+    """
+
+    __slots__ = ['latest']
+
+    def __init__(self):
+        self.latest = None
+
+    def publish(self, snapshot):
+        self.latest = snapshot
@@ -0,0 +1,225 @@
+"""
+Levels streamed in around the camera.
+
+A compiled level is split into square chunks of tiles, each with the
+collision geometry that overlaps it; see castlebats.level.
+
+The ChunkStreamer keeps only the chunks near the camera in memory.  Chunks
+within load_radius of the camera are read by a background thread, starting
+with the ones ahead of the direction the camera moves in.  A chunk is only
+dropped once it is farther away than keep_radius, so a camera moving back
+and forth over the edge of a chunk does not load it over and over.
+"""
+
+import queue
+import sys
+import threading
+
+import pygame
+
+from castlebats.level import LevelMapData, LevelRenderer
+
+
+class ChunkStreamer:
+    """
+    Keep the chunks around the camera resident
+
+    load_radius:  chunks this many chunks from the camera are loaded
+    keep_radius:  chunks are dropped once farther away than this
+    lookahead:    chunks are also loaded around the point this many chunks
+                  ahead of the camera, in the direction it moves
+    retries:      times a chunk that could not be read is asked for again
+                  before it is given up on
+
+    call update once per tick, from one thread.  resident may be read from
+    any thread.  an error reading a chunk stops neither the loader thread
+    nor the game; the next update writes it to stderr and asks for the
+    chunk again.  a chunk given up on stays unloaded until the streamer is
+    made again.
+    """
+
+    def __init__(self, level, load_radius=1, keep_radius=2, lookahead=1,
+                 retries=3):
+        assert keep_radius >= load_radius
+        self.level = level
+        self.load_radius = load_radius
+        self.keep_radius = keep_radius
+        self.lookahead = lookahead
+        self.retries = retries
+        self.resident = {}
+        self.pending = set()
+        self.center = None
+        self.loads = 0
+        self.evictions = 0
+        self.errors = 0
+        self.failures = {}
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._failed = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._load, name='streaming',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
+        self.level.close()
+
+    def _load(self):
+        while True:
+            key = self._requests.get()
+            if key is None:
+                return
+            try:
+                chunk = self.level.read(key)
+            except Exception as error:
+                self._failed.put((key, error))
+                continue
+            self._results.put(chunk)
+
+    def chunk_at(self, position):
+        x, y = position
+        size = self.level.chunk_size
+        return (int(x // (size * self.level.tilewidth)),
+                int(y // (size * self.level.tileheight)))
+
+    def _around(self, center, radius):
+        cx, cy = center
+        for y in range(max(0, cy - radius),
+                       min(self.level.rows, cy + radius + 1)):
+            for x in range(max(0, cx - radius),
+                           min(self.level.columns, cx + radius + 1)):
+                yield x, y
+
+    def wanted(self, position, velocity=(0, 0)):
+        """
+        return the keys of the chunks that should be resident, nearest to
+        the point ahead of the camera first
+        """
+        cx, cy = self.chunk_at(position)
+        dx = (velocity[0] > 0) - (velocity[0] < 0)
+        dy = (velocity[1] > 0) - (velocity[1] < 0)
+        ax = cx + dx * self.lookahead
+        ay = cy + dy * self.lookahead
+        keys = set(self._around((cx, cy), self.load_radius))
+        keys.update(self._around((ax, ay), self.load_radius))
+        return sorted(keys, key=lambda k: max(abs(k[0] - ax), abs(k[1] - ay)))
+
+    def load_now(self, position):
+        """
+        read the chunks around position on this thread, and wait for them
+        """
+        loaded = []
+        for key in self.wanted(position):
+            if key not in self.resident:
+                self.resident[key] = self.level.read(key)
+                self.loads += 1
+                loaded.append(key)
+        self.center = self.chunk_at(position)
+        return loaded
+
+    def update(self, position, velocity=(0, 0)):
+        """
+        take chunks that have been read, ask for the ones that are wanted,
+        and drop the ones that are too far away
+
+        returns two lists of keys: chunks made resident and chunks dropped
+        since the last update
+        """
+        while True:
+            try:
+                key, error = self._failed.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(key)
+            self.errors += 1
+            self.failures[key] = self.failures.get(key, 0) + 1
+            given_up = self.failures[key] > self.retries
+            sys.stderr.write('streaming: cannot read chunk {}: {}{}\n'.format(
+                key, error, '; giving up' if given_up else ''))
+
+        center = self.chunk_at(position)
+        self.center = center
+        cx, cy = center
+
+        def near(key, radius):
+            return max(abs(key[0] - cx), abs(key[1] - cy)) <= radius
+
+        loaded = []
+        while True:
+            try:
+                chunk = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(chunk.key)
+            self.failures.pop(chunk.key, None)
+            if near(chunk.key, self.keep_radius + self.lookahead):
+                self.resident[chunk.key] = chunk
+                self.loads += 1
+                loaded.append(chunk.key)
+
+        for key in self.wanted(position, velocity):
+            if (key not in self.resident and key not in self.pending and
+                    self.failures.get(key, 0) <= self.retries):
+                self.pending.add(key)
+                self._requests.put(key)
+
+        evicted = [key for key in self.resident
+                   if not near(key, self.keep_radius + self.lookahead)]
+        for key in evicted:
+            del self.resident[key]
+        self.evictions += len(evicted)
+        return loaded, evicted
+
+
+class StreamingMapData(LevelMapData):
+    """
+    pyscroll map data for a ChunkFile; only resident chunks have tiles
+    """
+
+    def __init__(self, level, streamer, images):
+        super().__init__(level, images)
+        self.streamer = streamer
+
+    def get_tile_image(self, position):
+        x, y, l = position
+        if not (0 <= x < self.level.width and 0 <= y < self.level.height):
+            raise ValueError
+
+        size = self.level.chunk_size
+        chunk = self.streamer.resident.get((x // size, y // size))
+        if chunk is None:
+            # not loaded yet.  the renderer clears the bottom layer for a
+            # ValueError, and the layers above are left empty, so nothing
+            # is drawn over sprites
+            if l == 0:
+                raise ValueError
+            return None
+        if chunk.tiles is None:
+            return None
+        return self.images[int(chunk.tiles[l, y % size, x % size])]
+
+
+class StreamingRenderer(LevelRenderer):
+    """
+    LevelRenderer for StreamingMapData
+    """
+
+    def queue_chunk(self, key):
+        """
+        draw the tiles of a chunk that was loaded after the view was drawn
+        """
+        size = self.data.level.chunk_size
+        cx, cy = key
+        area = pygame.Rect(cx * size, cy * size, size, size).clip(self.view)
+        if not area:
+            return
+        layers = list(self.data.visible_tile_layers)
+        self.update_queue((x, y, l) for x in range(area.left, area.right)
+                          for y in range(area.top, area.bottom)
+                          for l in layers)
@@ -0,0 +1,192 @@
+"""
+Flocking for swarms of bats.
+
+Each bat in the swarm steers by the bats near it, like the boids of Craig
+Reynolds, and towards the hero:
+
+- separation: away from bats that are too close
+- alignment: towards the mean velocity of its neighbours
+- cohesion: towards the mean position of its neighbours
+- homing: towards the target
+
+Steering is worked out for the whole swarm at once from the position and
+velocity columns of the World.  Neighbours are found with a uniform grid
+of cells as wide as the neighbour radius: the bats are sorted by cell, and
+each bat is only compared with the bats in the 3x3 cells around its own,
+so the cost grows with the number of bats and not with its square.
+
+Bats fly in the plane of the screen: y across and z down.  The new
+velocities are written back into the physics bodies, which move the bats
+on the next physics update.  The bodies are the source of truth (see
+castlebats.ecs), so reading them with sync_bodies and writing them back
+are each still a Python loop over the bats; only the steering itself is
+vectorized.
+"""
+
+import numpy
+
+from castlebats import ecs
+
+
+# the 3x3 cells around a cell, and the cell itself
+_OFFSETS = numpy.array([(dy, dz) for dy in (-1, 0, 1) for dz in (-1, 0, 1)])
+
+
+def neighbours(points, radius):
+    """
+    return two arrays of indices, i and j, with a pair for every two points
+    closer than radius.  each pair is given both ways; no point is paired
+    with itself
+    """
+    n = len(points)
+    if n < 2:
+        empty = numpy.zeros(0, dtype=int)
+        return empty, empty
+
+    # cell of each point, padded so the cells around every point are inside
+    # the grid and each cell has one key
+    cells = numpy.floor(points / radius).astype(int)
+    cells -= cells.min(axis=0) - 1
+    rows = cells[:, 1].max() + 2
+    keys = cells[:, 0] * rows + cells[:, 1]
+
+    # points sorted by cell; each cell is a run of the sorted keys
+    order = numpy.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    # for the cells around each point, the runs of points in them.  the
+    # points are taken in sorted order, so each row of cells to look up is
+    # sorted too, which makes searchsorted much faster
+    shifts = _OFFSETS[:, 0] * rows + _OFFSETS[:, 1]
+    around = (sorted_keys[None, :] + shifts[:, None]).ravel()
+    starts = numpy.searchsorted(sorted_keys, around, side='left')
+    counts = numpy.searchsorted(sorted_keys, around, side='right') - starts
+
+    # every point paired with every point in the runs around it
+    total = counts.sum()
+    i = order[numpy.repeat(numpy.tile(numpy.arange(n), len(_OFFSETS)),
+                           counts)]
+    first = numpy.repeat(starts - (numpy.cumsum(counts) - counts), counts)
+    j = order[numpy.arange(total) + first]
+
+    # columns of points gather faster than rows
+    y = numpy.ascontiguousarray(points[:, 0])
+    z = numpy.ascontiguousarray(points[:, 1])
+    dy = y[j] - y[i]
+    dz = z[j] - z[i]
+    near = (dy * dy + dz * dz < radius * radius) & (i != j)
+    return i[near], j[near]
+
+
+class Swarm:
+    """
+    Steer every SWARM entity of a World
+
+    radius:      bats closer than this are neighbours
+    spacing:     bats closer than this are pushed apart
+    separation, alignment, cohesion, homing:
+                 weight of each kind of steering
+    speed:       fastest a bat may fly, in pixels per physics update
+    turn:        steering is scaled by this, per second
+
+    usage:
+        swarm = Swarm()
+        while running:
+            ecs.sync_bodies(world)
+            swarm.update(world, hero_position, dt)
+    """
+
+    def __init__(self, radius=48, spacing=32, separation=4.0, alignment=1.0,
+                 cohesion=.3, homing=.8, speed=1.5, turn=3.0):
+        self.radius = radius
+        self.spacing = spacing
+        self.separation = separation
+        self.alignment = alignment
+        self.cohesion = cohesion
+        self.homing = homing
+        self.speed = speed
+        self.turn = turn
+        self.pairs = 0
+
+    def steer(self, position, velocity, target):
+        """
+        return the steering of each bat, from arrays of (y, z) positions
+        and velocities
+        """
+        n = len(position)
+        steer = numpy.zeros((n, 2))
+        i, j = neighbours(position, self.radius)
+        self.pairs = len(i)
+
+        if len(i):
+            count = numpy.bincount(i, minlength=n)
+            lonely = count == 0
+            count = numpy.maximum(count, 1)
+
+            def total(values):
+                return numpy.bincount(i, values, minlength=n)
+
+            y, z = numpy.array(position.T)
+            vy, vz = numpy.array(velocity.T)
+
+            # from the bat towards the mean of its neighbours
+            align = numpy.stack([total(vy[j]) / count - vy,
+                                 total(vz[j]) / count - vz], axis=1)
+            cohere = numpy.stack([total(y[j]) / count - y,
+                                  total(z[j]) / count - z], axis=1)
+            align[lonely] = 0
+            cohere[lonely] = 0
+
+            # push apart harder the closer two bats are, and the more bats
+            # are close.  this is not made a unit vector, so a crowded bat
+            # moves out of the crowd before it steers anywhere else
+            dy = y[i] - y[j]
+            dz = z[i] - z[j]
+            distance = numpy.sqrt(dy * dy + dz * dz)
+            push = (numpy.maximum(1 - distance / self.spacing, 0) /
+                    numpy.maximum(distance, 1e-6))
+            separate = numpy.stack([total(dy * push), total(dz * push)],
+                                   axis=1)
+
+            steer += (self.separation * separate +
+                      self.alignment * _unit(align) +
+                      self.cohesion * _unit(cohere))
+
+        if target is not None:
+            steer += self.homing * _unit(numpy.asarray(target) - position)
+        return steer
+
+    def update(self, world, target, dt):
+        """
+        steer the swarm of world towards target, a (y, z) position, and set
+        the velocity of their bodies.  the world must be synced with the
+        bodies first
+        """
+        rows = numpy.flatnonzero(world.category[:world.count] == ecs.SWARM)
+        if not len(rows):
+            return
+
+        # centers, so the bats of a swarm flock around each other
+        position = (world.position[rows, 1:] +
+                    world.size[rows, 1:] / 2)
+        velocity = world.velocity[rows, 1:]
+
+        velocity = velocity + self.steer(position, velocity, target) * (
+            self.turn * dt / 1000)
+        speed = numpy.sqrt((velocity * velocity).sum(axis=1))
+        fast = speed > self.speed
+        velocity[fast] *= (self.speed / speed[fast])[:, None]
+
+        world.velocity[rows, 1:] = velocity
+        bodies = world.bodies
+        for row, (y, z) in zip(rows.tolist(), velocity.tolist()):
+            vel = bodies[row].vel
+            vel.y = y
+            vel.z = z
+
+
+def _unit(vectors):
+    # each row scaled to length 1; rows of zero are left as they are
+    length = numpy.sqrt((vectors * vectors).sum(axis=1))
+    return vectors / numpy.maximum(length, 1e-6)[:, None]
+
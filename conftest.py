@@ -0,0 +1,2 @@
+# pytest adds the directory of this file to sys.path, so the tests can
+# import castlebats, physics and run_game from the top of the project
@@ -1,4 +1,14 @@
 from .physicsbody import Body2, Body3
 from .physicsgroup import PlatformerPhysicsGroup
 from .bbox import BBox
-from .euclid import Vector2, Vector3
\ No newline at end of file
+from .euclid import Vector2, Vector3
+
+
+# BBoxArray needs numpy; it is only imported when used, so the rest of the
+# package works without numpy
+def __getattr__(name):
+    if name == 'BBoxArray':
+        from .bboxarray import BBoxArray
+        return BBoxArray
+    raise AttributeError('module {!r} has no attribute {!r}'.format(
+        __name__, name))
@@ -1,19 +1,24 @@
-
 def intersect(a, b):
-    return (((a.back   >= b.back   and a.back   < b.front)   or
-             (b.back   >= a.back   and b.back   < a.front))  and
-            ((a.left   >= b.left   and a.left   < b.right)   or 
-             (b.left   >= a.left   and b.left   < a.right))  and
-            ((a.bottom >= b.bottom and a.bottom < b.top)     or
-             (b.bottom >= a.bottom and b.bottom < a.top)))
+    ax, ay, az = a.x, a.y, a.z
+    bx, by, bz = b.x, b.y, b.z
+    return (((ax >= bx and ax < bx + b.depth) or
+             (bx >= ax and bx < ax + a.depth)) and
+            ((ay >= by and ay < by + b.width) or
+             (by >= ay and by < ay + a.width)) and
+            ((az >= bz and az < bz + b.height) or
+             (bz >= az and bz < az + a.height)))
 
 # BUG: collisions on right side are not correct
 
 
-class BBox(list):
+class BBox:
     """
     Rect-like class for defining area in 3d space.
-    subclassed from list to provide fast index access
+
+    Values are stored in six slots, so a bbox is a fixed size and the
+    collision tests below work directly on the stored values without creating
+    temporary objects.  Index access is kept so a bbox can still be used like
+    the list it used to be: (x, y, z, depth, width, height).
 
     Not hashable.
 
@@ -21,43 +26,174 @@ class BBox(list):
     work as expected.
     """
 
-    __slots__ = []
+    __slots__ = ['x', 'y', 'z', 'depth', 'width', 'height']
+    __hash__ = None
+
+    def __init__(self, bbox=(0, 0, 0, 0, 0, 0)):
+        (self.x, self.y, self.z,
+         self.depth, self.width, self.height) = bbox
 
-    def copy(self):
+    def __copy__(self):
         return BBox(self)
 
+    copy = __copy__
+
+    def __repr__(self):
+        return 'BBox(%s, %s, %s, %s, %s, %s)' % tuple(self)
+
+    def __len__(self):
+        return 6
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z,
+                     self.depth, self.width, self.height))
+
+    def __eq__(self, other):
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __getitem__(self, key):
+        if key == 0:
+            return self.x
+        elif key == 1:
+            return self.y
+        elif key == 2:
+            return self.z
+        elif key == 3:
+            return self.depth
+        elif key == 4:
+            return self.width
+        elif key == 5:
+            return self.height
+        elif isinstance(key, slice):
+            return tuple(self)[key]
+        elif isinstance(key, int) and -6 <= key < 0:
+            return self[key + 6]
+        raise IndexError
+
+    def __setitem__(self, key, value):
+        if key == 0:
+            self.x = value
+        elif key == 1:
+            self.y = value
+        elif key == 2:
+            self.z = value
+        elif key == 3:
+            self.depth = value
+        elif key == 4:
+            self.width = value
+        elif key == 5:
+            self.height = value
+        elif isinstance(key, slice):
+            indexes = range(6)[key]
+            value = tuple(value)
+            if len(value) != len(indexes):
+                raise ValueError('BBox is a fixed size')
+            for i, v in zip(indexes, value):
+                self[i] = v
+        elif isinstance(key, int) and -6 <= key < 0:
+            self[key + 6] = value
+        else:
+            raise IndexError
+
     def move(self, x, y, z):
-        self[0] += x
-        self[1] += y
-        self[2] += z
+        self.x += x
+        self.y += y
+        self.z += z
 
     def inflate(self, x, y, z):
-        self[0] -= x / 2
-        self[1] -= y / 2
-        self[2] -= z / 2
-        self[3] += x
-        self[4] += y
-        self[5] += z
+        self.x -= x / 2
+        self.y -= y / 2
+        self.z -= z / 2
+        self.depth += x
+        self.width += y
+        self.height += z
 
     def scale(self, x, y, z):
-        self[0] *= x
-        self[1] *= y
-        self[2] *= z
-        self[3] *= x
-        self[4] *= y
-        self[5] *= z
+        self.x *= x
+        self.y *= y
+        self.z *= z
+        self.depth *= x
+        self.width *= y
+        self.height *= z
 
     def clamp(self):
         raise NotImplementedError
 
     def clip(self, other):
-        raise NotImplementedError
+        """
+        return a new bbox that is the overlap of this one and other
+
+        if they do not overlap, a bbox with no size at this origin is returned
+        """
+        clipped = BBox(self)
+        clipped.clip_ip(other)
+        return clipped
+
+    def clip_ip(self, other):
+        """
+        same as clip, but operates in place
+        """
+        if other.__class__ is not BBox:
+            other = BBox(other)
+
+        x0 = max(self.x, other.x)
+        y0 = max(self.y, other.y)
+        z0 = max(self.z, other.z)
+        x1 = min(self.x + self.depth, other.x + other.depth)
+        y1 = min(self.y + self.width, other.y + other.width)
+        z1 = min(self.z + self.height, other.z + other.height)
+
+        if x1 < x0 or y1 < y0 or z1 < z0:
+            self.depth = 0
+            self.width = 0
+            self.height = 0
+        else:
+            self.x = x0
+            self.y = y0
+            self.z = z0
+            self.depth = x1 - x0
+            self.width = y1 - y0
+            self.height = z1 - z0
 
     def union(self, other):
-        raise NotImplementedError
+        """
+        return a new bbox that completely covers this one and other
+        """
+        joined = BBox(self)
+        joined.union_ip(other)
+        return joined
 
-    def unionall(self, *rects):
-        raise NotImplementedError
+    def union_ip(self, other):
+        """
+        same as union, but operates in place
+        """
+        if other.__class__ is not BBox:
+            other = BBox(other)
+
+        x0 = min(self.x, other.x)
+        y0 = min(self.y, other.y)
+        z0 = min(self.z, other.z)
+        self.depth = max(self.x + self.depth, other.x + other.depth) - x0
+        self.width = max(self.y + self.width, other.y + other.width) - y0
+        self.height = max(self.z + self.height, other.z + other.height) - z0
+        self.x = x0
+        self.y = y0
+        self.z = z0
+
+    def unionall(self, *bboxes):
+        """
+        return a new bbox that completely covers this one and all others
+        """
+        joined = BBox(self)
+        for other in bboxes:
+            joined.union_ip(other)
+        return joined
 
     def fit(self):
         raise NotImplementedError
@@ -76,30 +212,32 @@ class BBox(list):
         if h < 0:
             z += h
             h = -h
-        return BBox(x, y, z, d, w, h)
+        return BBox((x, y, z, d, w, h))
 
     def contains(self, other):
-        raise NotImplementedError
-        other = BBox(other)
-        # this is not correct!
-        return ((self[0] <= other.back) and
-                (self[1] <= other.top) and
-                (self[2] <= other.front) and
-                (self[0] + self[4] >= other.right) and
-                (self[1] + self[5] >= other.bottom) and
-                (self[2] + self[3] >= other.back) and
-                (self[0] + self[4] > other.left) and
-                (self[1] + self[5] > other.top) and
-                (self[2] + self[3] > other.front))
+        """
+        return True if other is completely inside this bbox
+        """
+        if other.__class__ is not BBox:
+            other = BBox(other)
+
+        return (self.x <= other.x and
+                self.y <= other.y and
+                self.z <= other.z and
+                other.x + other.depth <= self.x + self.depth and
+                other.y + other.width <= self.y + self.width and
+                other.z + other.height <= self.z + self.height)
 
     def collidepoint(self, point):
         x, y, z = point
-        return (x >= self[0] and x < self[0] + self[3] and 
-                y >= self[1] and y < self[1] + self[4] and
-                z >= self[2] and z < self[2] + self[5])
+        return (x >= self.x and x < self.x + self.depth and
+                y >= self.y and y < self.y + self.width and
+                z >= self.z and z < self.z + self.height)
 
     def collidebbox(self, other):
-        return intersect(self, BBox(other))
+        if other.__class__ is not BBox:
+            other = BBox(other)
+        return intersect(self, other)
 
     def collidelist(self, l):
         for i, bbox in enumerate(l):
@@ -119,68 +257,46 @@ class BBox(list):
 
     @property
     def back(self):
-        return self[0]
+        return self.x
 
     @property
     def left(self):
-        return self[1]
+        return self.y
 
     @property
     def bottom(self):
-        return self[2]
+        return self.z
 
     @property
     def front(self):
-        return self[0] + self[3]
+        return self.x + self.depth
 
     @property
     def right(self):
-        return self[1] + self[4]
+        return self.y + self.width
 
     @property
     def top(self):
-        return self[2] + self[5]
+        return self.z + self.height
 
     @property
     def size(self):
-        return self[3], self[4], self[5]
+        return self.depth, self.width, self.height
 
     @property
     def origin(self):
-        return self[0], self[1], self[2]
+        return self.x, self.y, self.z
 
     @property
     def bottomcenter(self):
-        return self[0]+self[3]/2, self[1]+self[4]/2, self[2]
+        return self.x + self.depth / 2, self.y + self.width / 2, self.z
 
     @property
     def topcenter(self):
-        return self[0]+self[3]/2, self[1]+self[4]/2, self[2]+self[5]
+        return (self.x + self.depth / 2, self.y + self.width / 2,
+                self.z + self.height)
 
     @property
     def center(self):
-        return self[0]+self[3]/2, self[1]+self[4]/2, self[2]+self[5]/2
-
-    @property
-    def x(self):
-        return self[0]
-
-    @property
-    def y(self):
-        return self[1]
-
-    @property
-    def z(self):
-        return self[2]
-
-    @property
-    def depth(self):
-        return self[3]
-
-    @property
-    def width(self):
-        return self[4]
-
-    @property
-    def height(self):
-        return self[5]
+        return (self.x + self.depth / 2, self.y + self.width / 2,
+                self.z + self.height / 2)
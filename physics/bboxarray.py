@@ -0,0 +1,181 @@
+"""
+Batch operations over many bounding boxes at once.
+
+BBoxArray stores bboxes as rows of an (N, 6) float array, laid out the same
+way as a BBox: (x, y, z, depth, width, height).  Collision tests are done for
+all rows at once with numpy, so they are much faster than collidelistall for
+more than a handful of boxes.
+"""
+
+import numpy
+import pygame
+from .bbox import BBox
+
+
+def _overlap(a0, a1, b0, b1):
+    # same rule as bbox.intersect, on one axis
+    return ((a0 >= b0) & (a0 < b1)) | ((b0 >= a0) & (b0 < a1))
+
+
+class BBoxArray:
+    """
+    Array of bounding boxes
+
+    The rows are in the same order as the bboxes passed in, so the indexes
+    returned by the collision methods can be used with the original list.
+    """
+
+    __slots__ = ['data']
+
+    def __init__(self, bboxes=()):
+        data = numpy.array(bboxes, dtype=float)
+        if data.size == 0:
+            data = numpy.zeros((0, 6), dtype=float)
+        if data.ndim != 2 or data.shape[1] != 6:
+            raise ValueError('bbox array must have shape (N, 6)')
+        self.data = data
+
+    @classmethod
+    def from_rects(cls, rects, axes=(1, 2), depth=1):
+        """
+        create from pygame rects
+
+        axes are the bbox axes the rect x and y map to.  the default matches
+        the platformer mixin (zy plane), use (0, 1) for the adventure mixin.
+        the remaining axis will start at 0 and have the depth passed.
+        """
+        rects = numpy.array([tuple(r) for r in rects], dtype=float)
+        data = numpy.zeros((len(rects), 6), dtype=float)
+        if len(rects):
+            (other, ) = set(range(3)) - set(axes)
+            h, v = axes
+            data[:, h] = rects[:, 0]
+            data[:, v] = rects[:, 1]
+            data[:, h + 3] = rects[:, 2]
+            data[:, v + 3] = rects[:, 3]
+            data[:, other + 3] = depth
+        return cls(data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        """
+        return the BBox of a row, or a new BBoxArray of the rows of a slice
+        or of an index array
+        """
+        rows = self.data[key]
+        if rows.ndim == 2:
+            return BBoxArray(rows)
+        if rows.shape != (6, ):
+            raise TypeError('BBoxArray indices must be rows, not {}'.format(
+                type(key).__name__))
+        return BBox(rows.tolist())
+
+    def __setitem__(self, key, bbox):
+        self.data[key] = tuple(bbox)
+
+    def __iter__(self):
+        return (BBox(row) for row in self.data.tolist())
+
+    def __repr__(self):
+        return '<BBoxArray: {} bboxes>'.format(len(self))
+
+    def copy(self):
+        return BBoxArray(self.data.copy())
+
+    def to_bboxes(self):
+        return [BBox(row) for row in self.data.tolist()]
+
+    def to_rects(self, axes=(1, 2)):
+        h, v = axes
+        columns = self.data[:, [h, v, h + 3, v + 3]].tolist()
+        return [pygame.Rect(i) for i in columns]
+
+    @property
+    def origin(self):
+        return self.data[:, :3]
+
+    @property
+    def size(self):
+        return self.data[:, 3:]
+
+    def move(self, x, y, z):
+        """
+        move every bbox by the same amount, or pass arrays of shape (N,)
+        to move each one by a different amount
+        """
+        self.data[:, 0] += x
+        self.data[:, 1] += y
+        self.data[:, 2] += z
+
+    def inflate(self, x, y, z):
+        self.data[:, 0] -= numpy.divide(x, 2)
+        self.data[:, 1] -= numpy.divide(y, 2)
+        self.data[:, 2] -= numpy.divide(z, 2)
+        self.data[:, 3] += x
+        self.data[:, 4] += y
+        self.data[:, 5] += z
+
+    def scale(self, x, y, z):
+        self.data[:, 0::3] *= x
+        self.data[:, 1::3] *= y
+        self.data[:, 2::3] *= z
+
+    def collide_mask(self, bbox):
+        """
+        return boolean array, True for every row that intersects the bbox
+        """
+        x, y, z, d, w, h = bbox
+        a = self.data
+        return (_overlap(a[:, 0], a[:, 0] + a[:, 3], x, x + d) &
+                _overlap(a[:, 1], a[:, 1] + a[:, 4], y, y + w) &
+                _overlap(a[:, 2], a[:, 2] + a[:, 5], z, z + h))
+
+    def collidelistall(self, bbox):
+        """
+        return list of indexes of all rows that intersect the bbox
+
+        works like bbox.collidelistall, but the other way around
+        """
+        return numpy.flatnonzero(self.collide_mask(bbox)).tolist()
+
+    def collide_pairs(self, other=None):
+        """
+        return (N, M) boolean array of all intersecting pairs
+
+        if other is not passed, this array is tested against itself and
+        rows will not be reported as colliding with themselves
+        """
+        a = self.data
+        b = a if other is None else other.data
+        mask = numpy.ones((len(a), len(b)), dtype=bool)
+        for i in range(3):
+            a0 = a[:, i, None]
+            a1 = a0 + a[:, i + 3, None]
+            b0 = b[None, :, i]
+            b1 = b0 + b[None, :, i + 3]
+            mask &= _overlap(a0, a1, b0, b1)
+        if other is None:
+            numpy.fill_diagonal(mask, False)
+        return mask
+
+    def contains_mask(self, bbox):
+        """
+        return boolean array, True for every row completely inside the bbox
+        """
+        x, y, z, d, w, h = bbox
+        a = self.data
+        return ((a[:, 0] >= x) & (a[:, 0] + a[:, 3] <= x + d) &
+                (a[:, 1] >= y) & (a[:, 1] + a[:, 4] <= y + w) &
+                (a[:, 2] >= z) & (a[:, 2] + a[:, 5] <= z + h))
+
+    def unionall(self):
+        """
+        return a BBox that covers every row
+        """
+        if not len(self.data):
+            raise ValueError('cannot union an empty bbox array')
+        low = self.data[:, :3].min(axis=0)
+        high = (self.data[:, :3] + self.data[:, 3:]).max(axis=0)
+        return BBox(numpy.concatenate((low, high - low)).tolist())
@@ -1,39 +1,236 @@
-from functools import partial
+import threading
+import time
+import weakref
+from collections import OrderedDict, namedtuple
+from functools import partial, update_wrapper
 
 
-class memoize(object):
-    """cache the return value of a method
+CacheInfo = namedtuple('CacheInfo', 'hits, misses, evictions, size, maxsize')
 
-    This class is meant to be used as a decorator of methods. The return value
-    from a given method invocation will be cached on the instance whose method
-    was invoked. All arguments passed to a method decorated with memoize must
-    be hashable.
+# every memoized function, so the game can read all of the counters at once
+_registry = weakref.WeakSet()
 
-    If a memoized method is invoked directly on its class the result will not
-    be cached. Instead the method will be invoked like a static method:
+
+def cache_stats():
+    """return dict of CacheInfo for every memoized function, by name
+    """
+    return {m.name: m.info() for m in list(_registry)}
+
+
+def _make_key(args, kw):
+    if kw:
+        return args, frozenset(kw.items())
+    return args
+
+
+class _Cache(object):
+    """LRU cache with optional expiry.  used by memoize
+
+    Entries are stored with the time they expire and the tick they were
+    made on.  An entry is discarded when it is older than ttl seconds or the
+    tick has changed since it was stored.
+    """
+
+    def __init__(self, maxsize, ttl, tick):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.tick = tick
+        self.data = OrderedDict()
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """return (True, value) if key is cached, otherwise (False, None)
+        """
+        with self.lock:
+            try:
+                value, expires, tick = self.data[key]
+            except KeyError:
+                self.misses += 1
+                return False, None
+
+            if ((expires is not None and time.monotonic() > expires) or
+                    (self.tick is not None and self.tick() != tick)):
+                del self.data[key]
+                self.evictions += 1
+                self.misses += 1
+                return False, None
+
+            self.data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key, value):
+        expires = None
+        if self.ttl is not None:
+            expires = time.monotonic() + self.ttl
+        tick = None
+        if self.tick is not None:
+            tick = self.tick()
+
+        with self.lock:
+            self.data[key] = value, expires, tick
+            self.data.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self.data) > self.maxsize:
+                    self.data.popitem(last=False)
+                    self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class memoize(object):
+    """cache the return value of a function or method
+
+    This class is meant to be used as a decorator.  It can be used bare, or
+    called with options:
     class Obj(object):
         @memoize
         def add_to(self, arg):
-            return self + arg
+            return self.value + arg
+
+        @memoize(maxsize=32, ttl=1.0)
+        def slow(self, arg):
+            ...
+
+    maxsize:       number of results to keep; least recently used results are
+                   dropped first.  None will never drop results
+    ttl:           seconds a result is valid for.  None is forever
+    tick:          function returning the current game tick.  results are only
+                   valid for the tick they were made on
+    per_instance:  keep a separate cache for each instance a method is called
+                   on.  the instances are weakly referenced, so cached results
+                   will not keep them alive, and the cache is dropped with them
+    key:           function that builds the cache key from (args, kw).  all
+                   values in the key must be hashable
+
+    If per_instance is False, one cache is used for every call and the
+    instance is part of the key, so it must be hashable.
+
+    If a memoized method is invoked directly on its class the result will not
+    be cached. Instead the method will be invoked like a static method:
     Obj.add_to(1) # not enough arguments
     Obj.add_to(1, 2) # returns 3, result is not cached
+
+    Caches are thread safe.  Hit, miss and eviction counters can be read with
+    info() or, for every memoized function at once, with cache_stats().
     """
 
-    cache = {}
+    def __init__(self, func=None, maxsize=128, ttl=None, tick=None,
+                 per_instance=True, key=None):
+        self.func = None
+        self.name = None
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.tick = tick
+        self.per_instance = per_instance
+        self.make_key = key or _make_key
+        # reentrant: _drop_instance is a weakref callback, and may run on a
+        # thread that already holds the lock, if an instance is collected
+        # while a cache is being made
+        self.lock = threading.RLock()
+        self.cache = _Cache(maxsize, ttl, tick)
+        self.instance_caches = {}
+        self.retired = CacheInfo(0, 0, 0, 0, maxsize)
+        if func is not None:
+            self._wrap(func)
 
-    def __init__(self, func):
+    def _wrap(self, func):
         self.func = func
+        self.name = getattr(func, '__qualname__', repr(func))
+        update_wrapper(self, func)
+        _registry.add(self)
+        return self
 
     def __get__(self, obj, objtype=None):
         if obj is None:
             return self.func
-        return partial(self, obj)
+        return partial(self._call_method, obj)
 
     def __call__(self, *args, **kw):
-        key = (self.func, (args[0][0], args[0][1], args[1]), frozenset(kw.items()))
+        # used with options: @memoize(maxsize=10)
+        if self.func is None:
+            return self._wrap(args[0])
+        return self._lookup(self.cache, args, kw)
+
+    def _call_method(self, obj, *args, **kw):
+        if not self.per_instance:
+            return self._lookup(self.cache, (obj, ) + args, kw)
+
+        return self._lookup(self._instance_cache(obj), args, kw, obj)
+
+    def _lookup(self, cache, args, kw, obj=None):
+        key = self.make_key(args, kw)
+        found, value = cache.get(key)
+        if found:
+            return value
+
+        if obj is None:
+            value = self.func(*args, **kw)
+        else:
+            value = self.func(obj, *args, **kw)
+        cache.put(key, value)
+        return value
+
+    def _instance_cache(self, obj):
+        oid = id(obj)
         try:
-            return self.cache[key]
+            return self.instance_caches[oid][1]
         except KeyError:
-            value = self.func(*args, **kw)
-            self.cache[key] = value
-            return value
+            pass
+
+        with self.lock:
+            try:
+                return self.instance_caches[oid][1]
+            except KeyError:
+                pass
+
+            try:
+                ref = weakref.ref(obj, partial(self._drop_instance, oid))
+            except TypeError:
+                raise TypeError(
+                    'memoize cannot weakly reference {}; use per_instance='
+                    'False'.format(type(obj).__name__))
+
+            cache = _Cache(self.maxsize, self.ttl, self.tick)
+            self.instance_caches[oid] = ref, cache
+            return cache
+
+    def _drop_instance(self, oid, ref):
+        with self.lock:
+            try:
+                cache = self.instance_caches.pop(oid)[1]
+            except KeyError:
+                return
+            r = self.retired
+            self.retired = CacheInfo(r.hits + cache.hits,
+                                     r.misses + cache.misses,
+                                     r.evictions + cache.evictions,
+                                     0, self.maxsize)
+
+    def _caches(self):
+        with self.lock:
+            # copied first; a callback may drop an instance while iterating
+            entries = list(self.instance_caches.values())
+        return [self.cache] + [c for r, c in entries]
+
+    def info(self):
+        """return CacheInfo of all caches used by this function
+
+        counters of instances that no longer exist are included
+        """
+        hits, misses, evictions, size = self.retired[:4]
+        for cache in self._caches():
+            hits += cache.hits
+            misses += cache.misses
+            evictions += cache.evictions
+            size += len(cache.data)
+        return CacheInfo(hits, misses, evictions, size, self.maxsize)
+
+    def cache_clear(self):
+        for cache in self._caches():
+            cache.clear()
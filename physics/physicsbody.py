@@ -1,19 +1,26 @@
 from . import euclid, bbox
 
+# bodies that are not solid still collide with the level geometry, but pass
+# through other bodies, and are not tested against them when moved
+
 
 class Body2:
-    def __init__(self, thisbbox, acc, vel, gravity=True):
+    def __init__(self, thisbbox, acc, vel, gravity=True, solid=True):
         self.bbox = bbox.BBox(thisbbox)
         self.acc = euclid.Vector2(*acc)
         self.vel = euclid.Vector2(*vel)
         self.gravity = gravity
+        self.solid = solid
         self.physicsgroup = None
+        self.handle = None
 
 
 class Body3:
-    def __init__(self, thisbbox, acc, vel, gravity=True):
+    def __init__(self, thisbbox, acc, vel, gravity=True, solid=True):
         self.bbox = bbox.BBox(thisbbox)
         self.acc = euclid.Vector3(*acc)
         self.vel = euclid.Vector3(*vel)
         self.gravity = gravity
+        self.solid = solid
         self.physicsgroup = None
+        self.handle = None
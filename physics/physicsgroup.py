@@ -9,16 +9,32 @@ class PlatformerMixin:
     or surface coordinates.
     """
 
-    # accessing the bbox by index much faster than accessing by attribute
+    # bbox values are slots, so attribute access is faster than by index
     @staticmethod
     def to_rect(bbox):
-        return pygame.Rect((bbox[1], bbox[2], bbox[4], bbox[5]))
+        return pygame.Rect((bbox.y, bbox.z, bbox.width, bbox.height))
 
     @staticmethod
     def rectToBody(rect):
         newbbox = (0, rect.x, rect.y, 1, rect.width, rect.height)
         return physicsbody.Body3(newbbox, (0, 0, 0), (0, 0, 0), 0)
 
+    @staticmethod
+    def camera_matrix(center, size, zoom=1.0):
+        """
+        return matrix that transforms world points to surface coordinates
+
+        center is the camera position on the zy plane and size is the size of
+        the surface.  transformed points are (x, y, depth) on the surface.
+        """
+        cx, cy = center
+        w, h = size
+        M = euclid.Matrix4()
+        M.a, M.b, M.c, M.d = 0, zoom, 0, w / 2 - cx * zoom
+        M.e, M.f, M.g, M.h = 0, 0, zoom, h / 2 - cy * zoom
+        M.i, M.j, M.k, M.l = 1, 0, 0, 0
+        return M
+
 
 class AdventureMixin:
     """
@@ -26,16 +42,32 @@ class AdventureMixin:
     or surface coordinates.
     """
 
-    # accessing the bbox by index much faster than accessing by attribute
+    # bbox values are slots, so attribute access is faster than by index
     @staticmethod
     def to_rect(bbox):
-        return pygame.Rect((bbox[0], bbox[1], bbox[3], bbox[4]))
+        return pygame.Rect((bbox.x, bbox.y, bbox.depth, bbox.width))
 
     @staticmethod
     def rectToBody(rect):
         newbbox = (rect.x, rect.y, 0, rect.width, rect.height, 0)
         return physicsbody.Body3(newbbox, (0, 0, 0), (0, 0, 0), 0)
 
+    @staticmethod
+    def camera_matrix(center, size, zoom=1.0):
+        """
+        return matrix that transforms world points to surface coordinates
+
+        center is the camera position on the xy plane and size is the size of
+        the surface.  transformed points are (x, y, height) on the surface.
+        """
+        cx, cy = center
+        w, h = size
+        M = euclid.Matrix4()
+        M.a, M.b, M.c, M.d = zoom, 0, 0, w / 2 - cx * zoom
+        M.e, M.f, M.g, M.h = 0, zoom, 0, h / 2 - cy * zoom
+        M.i, M.j, M.k, M.l = 0, 0, 1, 0
+        return M
+
 
 class PhysicsGroup:
     """
@@ -74,16 +106,10 @@ class PhysicsGroup:
         self.timestep = 0.0
         self.gravity_delta = 0.0
         self.ground_friction = 0.0
+        self.geometry_sets = {}
         [self.scale_body(b, scaling) for b in self.bodies]
 
-        rects = []
-        for bbox in geometry:
-            body = physicsbody.Body3(bbox, (0, 0, 0), (0, 0, 0), 0)
-            self.scale_body(body, scaling)
-            self.static_bodies.add(body)
-            rects.append(self.to_rect(body.bbox))
-
-        self.geometry = quadtree.FastQuadTree(rects)
+        self.add_geometry(None, geometry)
         self.set_timestep(timestep)
 
     def __iter__(self):
@@ -97,6 +123,34 @@ class PhysicsGroup:
     def to_rect(body):
         raise NotImplementedError
 
+    def add_geometry(self, key, geometry):
+        """
+        add static bboxes under key, replacing any added with the same key
+
+        the geometry passed to __init__ is under the key None.  the quadtree
+        is static, so it is built again each time geometry changes.
+        """
+        bodies = []
+        for bbox in geometry:
+            body = physicsbody.Body3(bbox, (0, 0, 0), (0, 0, 0), 0)
+            self.scale_body(body, self.scaling)
+            bodies.append(body)
+        self.geometry_sets[key] = bodies
+        self.build_geometry()
+
+    def remove_geometry(self, key):
+        del self.geometry_sets[key]
+        self.build_geometry()
+
+    def build_geometry(self):
+        self.static_bodies = set()
+        rects = []
+        for bodies in self.geometry_sets.values():
+            for body in bodies:
+                self.static_bodies.add(body)
+                rects.append(self.to_rect(body.bbox))
+        self.geometry = quadtree.FastQuadTree(rects)
+
     def add(self, body):
         assert(isinstance(body, (physicsbody.Body3, physicsbody.Body2)))
         self.bodies.add(body)
@@ -109,11 +163,15 @@ class PhysicsGroup:
         for body in self.bodies:
             #print(body, body.vel, body.acc, body.gravity, self.timestep)
 
+            # in-place vector methods avoid temporary vectors in this loop
             if body.gravity:
-                body.acc += self.gravity_delta
+                body.acc.add_ip(self.gravity_delta)
 
-            body.vel += body.acc * self.timestep
-            x, y, z = body.vel
+            vel = body.vel
+            vel.add_scaled(body.acc, self.timestep)
+            x = vel.x
+            y = vel.y
+            z = vel.z
 
             if not x == 0:
                 if not self.move_body(body, (x, 0, 0)):
@@ -172,21 +230,21 @@ class PhysicsGroup:
         body.bbox.move(x, y, z)
 
         if self.test_collision_geometry(body.bbox):
-            if body.bbox[2] < -10:
-                body.bbox[2] = -10.0
+            if body.bbox.z < -10:
+                body.bbox.z = -10.0
                 body.bbox.move(-x, -y, 0)
             else:
                 body.bbox.move(-x, -y, -z)
             return False
 
-        else:
+        elif body.solid:
             # test for collision with another object
             # must do a spatial hash or oct tree or something here [later]
             checked = set()
             bbox = body.bbox
             checked.add(body)
             for other in (b for b in self.bodies if b not in checked):
-                if bbox.collidebbox(other.bbox):
+                if other.solid and bbox.collidebbox(other.bbox):
                     body.bbox.move(-x, -y, -z)
                     return False
                     # allow for pushing objects, but causes recursion errors
@@ -1,15 +1,48 @@
 __author__ = 'leif'
 
+import sys
+from castlebats.profiling import StartupProfiler
+
+# startup is timed from here.  the imports below are only timed when asked
+# for, and the arguments are parsed after them
+startup = StartupProfiler()
+if '--profile-startup' in sys.argv:
+    startup.start()
+
 import os
+import math
+import random
+import argparse
 import pytmx
 import pytmx.tmxloader
+import numpy
 import pygame
 import physics
-import itertools
 import threading
+import contextlib
+import queue
+import time
 from pygame.locals import *
 import pyscroll
+from castlebats import ecs
+from castlebats.assets import cache
+from castlebats.audio import AudioManager
+from castlebats.atlas import Atlas
+from castlebats.presenter import Presenter
+from castlebats.parallax import Parallax, ParallaxLayer, opaque_tiles
+from castlebats.pool import ActorPool
+from castlebats.renderlist import RenderList, RenderRecord
 from castlebats.buttons import *
+from castlebats.profiling import AllocationProfiler
+from castlebats.snapshot import ActorState, Snapshot, SnapshotBuffer
+from castlebats.scheduler import FrameScheduler
+from castlebats.slotmap import SlotMap
+from castlebats.swarm import Swarm
+from castlebats.level import ChunkFile, LevelMapData, LevelRenderer
+from castlebats.level import TileImages, is_current, level_path, read_level
+from castlebats.level import write_level
+from castlebats.streaming import ChunkStreamer, StreamingMapData
+from castlebats.streaming import StreamingRenderer
 
 
 RESOURCE_PATH = 'resources'
@@ -19,6 +52,24 @@ MOVE_POWER = 2
 JUMP_POWER = 1.5
 TARGET_FPS = 40
 
+# the game was tuned with three updates for every 60th of a second, each
+# passed a 60th of a second.  updates are run at that fixed rate, and frames
+# are drawn at TARGET_FPS
+UPDATE_RATE = 180
+UPDATE_TIME = 1000 / 60.
+
+# actors this far outside the view are still animated and drawn, so
+# sprites larger than their bbox do not pop in at the edges
+VIEW_MARGIN = 64
+
+# removed bats kept to be spawned again
+BAT_POOL_SIZE = 32
+
+# bats spawned together every BAT_SPAWN_TIME ms, scattered over BAT_SCATTER
+# pixels so the swarm can spread out
+BAT_SPAWN_TIME = 5000
+BAT_SCATTER = 96
+
 KEY_MAP = {
     K_LEFT: P1_LEFT,
     K_RIGHT: P1_RIGHT,
@@ -28,8 +79,9 @@ KEY_MAP = {
     K_w: P1_ACTION2,
 }
 
+# name: (file, instances that may play at once)
 SOUND_FILES = {
-    'sword': 'sword2.wav',
+    'sword': ('sword2.wav', 1),
 }
 
 
@@ -37,21 +89,40 @@ MUSIC_FILES = {
     'dungeon': 'dungeon.ogg'
 }
 
+# used in place of a profiler section when not profiling
+NULL_SECTION = contextlib.nullcontext()
+
 
 def load_map(filename):
     return pytmx.tmxloader.load_pygame(
         os.path.join(RESOURCE_PATH, filename), pixelalpha=False)
 
 
-def load_image(filename):
-    return pygame.image.load(os.path.join(RESOURCE_PATH, filename))
+def load_level(filename):
+    # the compiled level, or None if the map has not been compiled since it
+    # was last changed
+    tmx_path = os.path.join(RESOURCE_PATH, filename)
+    path = level_path(tmx_path)
+    if is_current(path, tmx_path):
+        return read_level(path)
+
+
+def open_chunks(filename):
+    # streaming needs the compiled level, so it is compiled here if needed
+    tmx_path = os.path.join(RESOURCE_PATH, filename)
+    path = level_path(tmx_path)
+    if not is_current(path, tmx_path):
+        write_level(tmx_path, path)
+    return ChunkFile(path)
 
 
-def load_sound(name):
-    return pygame.mixer.Sound(os.path.join(RESOURCE_PATH, SOUND_FILES[name]))
+def load_image(filename):
+    return cache.image(os.path.join(RESOURCE_PATH, filename))
 
 
 def play_music(name):
+    if not pygame.mixer.get_init():
+        return
     try:
         pygame.mixer.music.load(os.path.join(RESOURCE_PATH, MUSIC_FILES[name]))
         pygame.mixer.music.play(-1)
@@ -59,93 +130,481 @@ def play_music(name):
         pass
 
 
+def pack_animations(classes):
+    # copy every frame of every class into one atlas, and swap the frames of
+    # the classes for views into the atlas
+    atlas = Atlas()
+    for cls in classes:
+        for name, (ttl, frames) in cls.animations.items():
+            for index, frame in enumerate(frames):
+                for flip, (image, axis) in enumerate(frame):
+                    atlas.add((cls.name, name, index, flip), image, axis)
+    atlas.build()
+    bind_animations(atlas, classes)
+    return atlas
+
+
+def bind_animations(atlas, classes):
+    # use the images of the atlas for the frames of the classes.  the lists
+    # of frames are changed in place, since sprites keep references to them
+    for cls in classes:
+        for name, (ttl, frames) in cls.animations.items():
+            for index, frame in enumerate(frames):
+                frames[index] = tuple(
+                    (atlas.image((cls.name, name, index, flip)), axis)
+                    for flip, (image, axis) in enumerate(frame))
+
+
+def merge_rects(rects):
+    # join rects that overlap, so no area is drawn twice
+    merged = []
+    for rect in rects:
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect = rect.union(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
 # simple wrapper to keep the screen resizeable
 def init_screen(width, height):
     return pygame.display.set_mode((width, height), pygame.RESIZABLE)
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, dirty_rects=False, zoom=1, stream=False,
+                 bat_pool=BAT_POOL_SIZE, swarm_size=1):
         self.buffer_size = None
         self.map_buffer = None
+        self.dirty_rects = dirty_rects
+        self.drawn_camera = None
+        self.drawn = set()
+        self.frame = 0
+        self.render_list = RenderList()
+        self.render_records = {}
+        self.view_center = None
+        self.view_transform = numpy.zeros((6, 3))
+        self.view_offset = numpy.zeros(3)
+        self.actor_boxes = numpy.zeros((0, 6))
+        self.actor_positions = numpy.zeros((0, 3))
         self.running = False
-        self.actors = set()
+        self.actors = SlotMap()
+        self.commands = []
         self.time = 0
         self.hero = None
-        self.body_mapping = {}
-        self.actors_lock = threading.Lock()
-        self._add_queue = set()
-        self._remove_queue = set()
-
-        self.init_buffer([screen.get_width() / 2, screen.get_height() / 2])
-
-        self.tmx_data = load_map('level.tmx')
-        map_data = pyscroll.TiledMapData(self.tmx_data)
-        self.map_layer = pyscroll.BufferedRenderer(map_data, self.buffer_size, (0, 0, 0))
-        self.bg = load_image('exterior-parallaxBG1.png')
+        self.profiler = None
+        self.ticks = 0
+        self.snapshots = SnapshotBuffer()
+        self.input_queue = queue.Queue()
+        self.scheduler = None
+        self.tmx_data = None
+        self.level = None
+        self.streamer = None
+        self.loaded_chunks = queue.Queue()
+
+        self.audio = AudioManager()
+        for name, (filename, voices) in SOUND_FILES.items():
+            self.audio.add(name, os.path.join(RESOURCE_PATH, filename), voices)
+
+        self.presenter = Presenter(2, zoom)
+        self.presenter.layout(screen)
+        self.init_buffer(self.presenter.buffer_size)
+
+        with startup.step('map'):
+            map_data, covered, geometry = self.init_map(stream)
+
+        # dirty rect drawing clips the map buffer itself
+        if dirty_rects:
+            self.map_layer.clipping = False
+
+        # far mountains, then the nearer hills, which have a colorkey
+        with startup.step('background'):
+            hills = load_image('exterior-parallaxBG2.png')
+            self.parallax = Parallax(
+                [ParallaxLayer(load_image('exterior-parallaxBG1.png'), (.25, 0)),
+                 ParallaxLayer(hills, (.5, 0), colorkey=hills.get_at((0, 0)))],
+                covered, (map_data.tilewidth, map_data.tileheight))
+
+        with startup.step('physics'):
+            self.physicsgroup = physics.PlatformerPhysicsGroup(1, TIMESTEP, GRAVITY, [], geometry)
+            if self.streamer is not None:
+                for key in self.streamer.load_now(self.spawn_point('hero')):
+                    self.add_chunk(key)
+                self.streamer.start()
+            self.world = ecs.World()
+            self.bats = ActorPool(lambda: Bat(self.world), bat_pool, 'bat')
+            self.pools = {Bat: self.bats}
+            self.swarm = Swarm()
+            self.swarm_size = swarm_size
+
+        # load every sprite now, so spawning one never reads a file.  sounds
+        # are loaded when audio is started, after the first frame
+        with startup.step('sprites'):
+            self.sprite_classes = Hero, Bat
+            for cls in self.sprite_classes:
+                cls.load_animations()
+            self.atlas = pack_animations(self.sprite_classes)
+            self.convert_images()
 
-        geometry = []
-        for obj in self.tmx_data.objects:
-            bbox = (0, obj.x, obj.y, 0, obj.width, obj.height)
-            geometry.append(bbox)
-
-        self.physicsgroup = physics.PlatformerPhysicsGroup(1, TIMESTEP, GRAVITY, [], geometry)
         self.new_hero()
+        self.apply_commands()
+        self.publish()
+
+    def init_map(self, stream):
+        """
+        load the level, and return its map data, the tiles that hide the
+        background and the collision geometry
+        """
+        # when streaming, only the chunks of the level near the camera are
+        # kept, and the map has none of its tiles or geometry to start with.
+        # otherwise the compiled level is used, if there is one, and the
+        # .tmx map if not
+        if stream:
+            self.level = open_chunks('level.tmx')
+        else:
+            self.level = load_level('level.tmx')
+
+        if stream:
+            self.streamer = ChunkStreamer(self.level)
+            map_data = StreamingMapData(self.level, self.streamer,
+                                        TileImages(self.level, RESOURCE_PATH))
+            self.map_layer = StreamingRenderer(map_data, self.buffer_size, (0, 0, 0))
+            covered = None
+            geometry = []
+        elif self.level is not None:
+            images = TileImages(self.level, RESOURCE_PATH)
+            map_data = LevelMapData(self.level, images)
+            self.map_layer = LevelRenderer(map_data, self.buffer_size, (0, 0, 0))
+            covered = opaque_tiles(images, self.level.data)
+            geometry = [(0, x, y, 0, w, h)
+                        for x, y, w, h in self.level.geometry]
+        else:
+            self.tmx_data = load_map('level.tmx')
+            map_data = pyscroll.TiledMapData(self.tmx_data)
+            self.map_layer = pyscroll.BufferedRenderer(map_data, self.buffer_size, (0, 0, 0))
+            covered = opaque_tiles(
+                self.tmx_data.images,
+                [self.tmx_data.layers[i].data
+                 for i in self.tmx_data.visible_tile_layers])
+            geometry = []
+            for obj in self.tmx_data.objects:
+                bbox = (0, obj.x, obj.y, 0, obj.width, obj.height)
+                geometry.append(bbox)
+
+        return map_data, covered, geometry
+
+    def start_audio(self):
+        # opening the mixer is slow and nothing is heard before the first
+        # frame, so audio is started after it is drawn
+        with startup.step('audio'):
+            try:
+                pygame.mixer.init(buffer=0)
+            except pygame.error:
+                return
+            self.audio.start()
+        play_music('dungeon')
+
+    def play_sound(self, name, actor=None):
+        # sounds are queued, and played by the main thread once per frame
+        position = None
+        if actor is not None:
+            x, y, z = actor.body.bbox.center
+            position = y, z
+        self.audio.play(name, position)
 
     def new_hero(self):
-        hero = Hero()
-        obj = self.tmx_data.get_object_by_name('hero')
-        hero.body.bbox.move(0, obj.x, obj.y)
+        hero = Hero(self.world)
+        hero.body.bbox.move(0, *self.spawn_point('hero'))
         self.add_actor(hero)
         self.hero = hero
 
+    def spawn_point(self, name):
+        # position of the named object of the map
+        if self.level is not None:
+            x, y, w, h = self.level.objects[name]
+            return x, y
+        obj = self.tmx_data.get_object_by_name(name)
+        return obj.x, obj.y
+
+    def add_chunk(self, key):
+        # a chunk was made resident: collide with its geometry, and have
+        # its tiles drawn
+        geometry = [(0, x, y, 0, w, h)
+                    for x, y, w, h in self.streamer.resident[key].geometry]
+        if geometry:
+            self.physicsgroup.add_geometry(key, geometry)
+        self.loaded_chunks.put(key)
+
+    def remove_chunk(self, key):
+        if key in self.physicsgroup.geometry_sets:
+            self.physicsgroup.remove_geometry(key)
+
+    def stream_level(self):
+        # the streamer reads chunks ahead of where the hero is moving
+        vel = self.hero.body.vel
+        loaded, evicted = self.streamer.update(self.camera(), (vel.y, vel.z))
+        for key in evicted:
+            self.remove_chunk(key)
+        for key in loaded:
+            self.add_chunk(key)
+
+    def convert_images(self):
+        # change every image to the display format so blits do not have to
+        # convert pixels.  must be done again when the display mode changes
+        cache.convert()
+        self.parallax.set_size(self.buffer_size)
+        self.atlas.convert()
+        bind_animations(self.atlas, self.sprite_classes)
+
+    def enable_allocation_profiler(self):
+        profiler = AllocationProfiler()
+        profiler.register('quadtree', physics.quadtree.__file__)
+        profiler.register('physics', os.path.dirname(physics.__file__))
+        profiler.register('draw', Game.draw, Game.draw_dirty, Game.draw_bg)
+        profiler.register('fsm', os.path.join('castlebats', 'fsm'),
+                          Hero.change_state, Hero.handle_input,
+                          Bat.change_state)
+
+        # the quadtree is used from inside physics, so its section is made
+        # by wrapping the methods of this physics group that use it
+        group = self.physicsgroup
+        group.test_collision_geometry = profiler.wrap(
+            'quadtree', group.test_collision_geometry)
+        group.build_geometry = profiler.wrap('quadtree', group.build_geometry)
+
+        # started by run, so only the game loop is profiled
+        self.profiler = profiler
+
+    def profile(self, name):
+        # measure temporary allocations of a part of the frame, if profiling
+        if self.profiler:
+            return self.profiler.section(name)
+        return NULL_SECTION
+
+    # actors are never added or removed right away.  the change is put in
+    # the command list and applied by apply_commands, once at the end of each
+    # update, so nothing changes while actors are being iterated over
     def add_actor(self, actor):
-        if self.actors_lock.acquire(False):
-            actor.group = self
-            self.body_mapping[actor.body] = actor
-            self.actors.add(actor)
-            self.physicsgroup.add(actor.body)
-            self.actors_lock.release()
-        else:
-            self._add_queue.add(actor)
+        self.commands.append(('add', actor))
 
     def remove_actor(self, actor):
-        if self.actors_lock.acquire(False):
-            actor.group = None
-            del self.body_mapping[actor.body]
-            self.actors.remove(actor)
-            self.physicsgroup.remove(actor.body)
-            self.actors_lock.release()
-        else:
-            self._remove_queue.add(actor)
+        self.commands.append(('remove', actor))
+
+    def apply_commands(self):
+        commands, self.commands = self.commands, []
+        for command, actor in commands:
+            if command == 'add':
+                actor.spawn()
+                actor.group = self
+                actor.handle = self.actors.insert(actor)
+                actor.body.handle = actor.handle
+                self.physicsgroup.add(actor.body)
+
+            # an actor may be removed more than once in a tick; the handle is
+            # stale after the first time
+            elif command == 'remove' and actor.handle in self.actors:
+                actor.group = None
+                self.actors.remove(actor.handle)
+                self.physicsgroup.remove(actor.body)
+                self.world.destroy(actor.entity)
+                pool = self.pools.get(type(actor))
+                if pool is not None:
+                    pool.release(actor)
+
+    def spawn_bats(self, count):
+        # behind the hero, out of view
+        y = self.hero.body.bbox.y - 500
+        z = self.hero.body.bbox.z
+        for i in range(count):
+            bat = self.bats.acquire()
+            if count > 1:
+                bat.body.bbox[:3] = (0, y + random.uniform(0, BAT_SCATTER),
+                                     z - random.uniform(0, BAT_SCATTER))
+            else:
+                bat.body.bbox[:3] = (0, y, z)
+            self.add_actor(bat)
 
     def init_buffer(self, size):
         self.map_buffer = pygame.Surface(size)
         self.buffer_size = self.map_buffer.get_size()
+        self.drawn_camera = None
+
+    def camera(self):
+        # the center of the view, in map pixels
+        x, y, z = self.hero.body.bbox.topcenter
+        return y, z - 72
+
+    def view_box(self):
+        # the world box seen by the camera, with a margin, as (low, high)
+        y, z = self.camera()
+        width, height = self.buffer_size
+        w = width / 2 + VIEW_MARGIN
+        h = height / 2 + VIEW_MARGIN
+        return (-math.inf, y - w, z - h), (math.inf, y + w, z + h)
+
+    def publish(self):
+        # copy what is needed for drawing into a new snapshot.  only actors
+        # near the view are copied, so drawing never sees the others
+        self.ticks += 1
+        hero = ActorState(self.hero.handle, self.hero.image,
+                          tuple(self.hero.body.bbox), tuple(self.hero.axis),
+                          self.hero.layer)
+        world = self.world
+        visible = ecs.in_view(world, *self.view_box())
+        actors = tuple(ActorState(actor.handle, actor.image,
+                                  tuple(actor.body.bbox), tuple(actor.axis),
+                                  actor.layer)
+                       for actor in (world.actors[row] for row in
+                                     numpy.flatnonzero(visible).tolist()))
+        self.snapshots.publish(Snapshot(self.ticks, self.camera(), hero,
+                                        actors))
 
     def draw(self, surface):
+        """
+        draw the latest snapshot
+
+        returns a list of the screen rects that changed, or None if the whole
+        screen was drawn
+        """
+        # only the latest snapshot is used here, never the actors, so drawing
+        # is safe while the simulation thread is running
+        if self.presenter.layout(surface):
+            self.init_buffer(self.presenter.buffer_size)
+            self.map_layer.set_size(self.buffer_size)
+            self.parallax.set_size(self.buffer_size)
+
+        # chunks that arrived since the last frame are drawn in full
+        chunks = []
+        while True:
+            try:
+                chunks.append(self.loaded_chunks.get_nowait())
+            except queue.Empty:
+                break
+        if chunks:
+            self.drawn_camera = None
+
+        snapshot = self.snapshots.latest
+        hero = snapshot.hero
+        hx, hy, hz, hd, hw, hh = hero.bbox
+        self.update_view(hy + hw / 2, hz - 72)
+        positions = self.transform_actors(snapshot.actors)
+        self.update_render_list(snapshot.actors, positions)
+        sprites = self.render_list
+
+        # when the camera has not moved, the map and background are the same
+        # as the last frame, so only the sprites that changed are drawn
+        camera = tuple(round(i) for i in snapshot.camera)
+        if self.dirty_rects:
+            # the area each sprite covers on the buffer
+            drawn = {(record[0], tuple(record[1])) for record in sprites}
+            changed = drawn ^ self.drawn
+            self.drawn = drawn
+            if camera == self.drawn_camera and self.presenter.integer:
+                return self.draw_dirty(surface, sprites, changed)
+
+        self.drawn_camera = camera
+        self.map_layer.center(snapshot.camera)
+        for key in chunks:
+            self.map_layer.queue_chunk(key)
         self.draw_bg(self.map_buffer)
-        bx, by = self.map_buffer.get_size()
-        cx_, cy_, cz_ = self.hero.body.bbox.bottomcenter
-        cx = cy_
-        cy = cz_ - 72
-        sprites = []
-        for actor in self.actors:
-            rect = self.physicsgroup.to_rect(actor.body.bbox)
-            d, w, h = self.hero.body.bbox.size
-            xx, yy = rect.topleft
-            xx = xx - cx + (bx / 2)
-            yy = yy - cy + (by / 2)
-            x = xx - self.hero.axis.y + (w / 2)
-            y = yy - self.hero.axis.z
-            sprites.append((actor.image, pygame.Rect(x, y, w, h), 0))
-
-        self.map_layer.draw(self.map_buffer, surface.get_rect(), sprites)
-        pygame.transform.scale(self.map_buffer, surface.get_size(), surface)
+        self.map_layer.draw(self.map_buffer, self.map_buffer.get_rect(),
+                            sprites)
+        self.presenter.present(self.map_buffer, surface)
+
+    def update_view(self, x, y):
+        # the camera transform is only made again when the camera moves or
+        # the buffer changes size.  it is kept as arrays to multiply whole
+        # bboxes by; the size columns of a bbox are not moved by the camera,
+        # so their rows of the transform are 0
+        size = self.buffer_size
+        if self.view_center == (x, y, size):
+            return
+        self.view_center = x, y, size
+        camera = self.physicsgroup.camera_matrix((x, y), size).as_array()
+        self.view_transform[:3] = camera[:3, :3].T
+        self.view_offset[:] = camera[:3, 3]
+
+    def transform_actors(self, actors):
+        # buffer positions of the actors, written into arrays that are kept
+        # between frames and only made again when the number of actors
+        # changes
+        count = len(actors)
+        if len(self.actor_boxes) != count:
+            self.actor_boxes = numpy.zeros((count, 6))
+            self.actor_positions = numpy.zeros((count, 3))
+        boxes = self.actor_boxes
+        positions = self.actor_positions
+        for index, actor in enumerate(actors):
+            boxes[index] = actor.bbox
+        numpy.dot(boxes, self.view_transform, out=positions)
+        positions += self.view_offset
+        return positions
+
+    def update_render_list(self, actors, positions):
+        # each drawn actor keeps its render record between frames; records
+        # are only changed when the actor moves or shows another frame
+        self.frame += 1
+        frame = self.frame
+        records = self.render_records
+        render_list = self.render_list
+        item = positions.item
+        for index, actor in enumerate(actors):
+            axis = actor.axis
+            record = records.get(actor.handle)
+            if record is None:
+                record = RenderRecord(actor.image, actor.layer)
+                records[actor.handle] = record
+                render_list.add(record)
+            elif record[2] != actor.layer:
+                render_list.set_layer(record, actor.layer)
+            record.update(actor.image, axis[1], axis[2],
+                          item(index, 0) + actor.bbox[4] / 2, item(index, 1))
+            record.stamp = frame
+
+        # actors that were removed or left the view
+        if len(records) > len(actors):
+            for handle, record in list(records.items()):
+                if record.stamp != frame:
+                    del records[handle]
+                    render_list.remove(record)
+
+    def draw_dirty(self, surface, sprites, changed):
+        # redraw the buffer only where a sprite was or is now, then scale
+        # those parts to the screen
+        buffer = self.map_buffer
+        bounds = buffer.get_rect()
+
+        # pyscroll draws whole tiles of upper layers over sprites, so the
+        # area to redraw is grown out to the edges of the tiles
+        tw = self.map_layer.data.tilewidth
+        th = self.map_layer.data.tileheight
+        ox = self.map_layer.xoffset
+        oy = self.map_layer.yoffset
+        dirty = []
+        for image, rect in changed:
+            rect = bounds.clip(rect)
+            if rect:
+                left = (rect.left + ox) // tw * tw - ox
+                top = (rect.top + oy) // th * th - oy
+                right = -(-(rect.right + ox) // tw) * tw - ox
+                bottom = -(-(rect.bottom + oy) // th) * th - oy
+                dirty.append(bounds.clip(left, top, right - left, bottom - top))
+        dirty = merge_rects(dirty)
+
+        for rect in dirty:
+            buffer.set_clip(rect)
+            self.draw_bg(buffer)
+            self.map_layer.draw(buffer, bounds, sprites)
+
+        buffer.set_clip(None)
+        return self.presenter.present_rects(buffer, surface, dirty)
 
     def draw_bg(self, surface):
-        surface.blit(self.bg, (0, 0))
-        surface.blit(self.bg, (self.bg.get_width(), 0))
+        # the top left of the view, in map pixels, from the centered camera
+        x, y = self.drawn_camera
+        width, height = self.buffer_size
+        self.parallax.draw(surface, (x - width / 2, y - height / 2))
 
     def handle_input(self):
         for event in pygame.event.get():
@@ -158,148 +617,286 @@ class Game:
                     self.running = False
                     break
 
+                elif event.key == K_F9 and self.profiler:
+                    self.profiler.dump()
+
+                elif event.key == K_F10 and self.scheduler:
+                    print(self.scheduler.report())
+
+                elif event.key == K_F11:
+                    print(cache.report())
+                    print(self.audio.report())
+                    for pool in self.pools.values():
+                        print(pool.report())
+
+            # the buffer is resized by the presenter on the next draw
             elif event.type == VIDEORESIZE:
                 init_screen(event.w, event.h)
-                self.init_buffer([screen.get_width() / 2, screen.get_height() / 2])
-                self.map_layer.set_size(self.buffer_size)
+                self.convert_images()
 
-            self.hero.handle_input(event)
+            # the hero is changed by the simulation, so input is queued for it
+            self.input_queue.put(event)
 
     def update(self, dt):
         self.time += dt
 
-        x, y, z = self.hero.body.bbox.topcenter
-        self.map_layer.center((y, z - 72))
-        self.physicsgroup.update(dt)
-
-        with self.actors_lock:
-            for actor in self.actors:
-                if actor.alive:
-                    actor.update(dt)
-
-                if actor.body.bbox.bottom > 1800:
-                    actor.alive = False
-
-                # do not add else here
-                if not actor.alive:
-                    self.remove_actor(actor)
-                    if actor is self.hero:
-                        self.new_hero()
-
-        for actor in self._remove_queue:
+        with self.profile('fsm'):
+            while True:
+                try:
+                    event = self.input_queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.hero.handle_input(event)
+
+        with self.profile('physics'):
+            self.physicsgroup.update(dt)
+
+        if self.streamer is not None:
+            with self.profile('streaming'):
+                self.stream_level()
+
+        # actors are updated all at once by the systems in ecs; only actors
+        # with a new animation frame or a finished animation are called
+        with self.profile('actors'):
+            world = self.world
+            actors = world.actors
+            ecs.sync_bodies(world)
+            hero = self.hero.body.bbox
+            self.swarm.update(world, hero.center[1:], dt)
+            visible = ecs.in_view(world, *self.view_box())
+            changed, finished = ecs.advance_animation(world, dt, visible)
+            for row in changed.tolist():
+                actors[row].show_frame(world.anim_frame[row])
+            for row in finished.tolist():
+                actors[row].animation_finished()
+
+            ecs.check_fallen(world, 1800)
+            dead = [actors[row] for row in ecs.find_dead(world).tolist()]
+
+        for actor in dead:
             self.remove_actor(actor)
+            if actor is self.hero:
+                self.new_hero()
 
-        for actor in self._add_queue:
-            self.add_actor(actor)
+        if self.time >= BAT_SPAWN_TIME:
+            self.time -= BAT_SPAWN_TIME
+            self.spawn_bats(self.swarm_size)
 
-        self._remove_queue = set()
-        self._add_queue = set()
+        self.apply_commands()
+        self.publish()
 
-        if self.time >= 5000:
-            self.time -= 5000
-            bat = Bat()
-            bat.body.bbox[:3] = (0, self.hero.body.bbox.y - 500, self.hero.body.bbox.z)
-            self.add_actor(bat)
-
-    def run(self):
-        clock = pygame.time.Clock()
-        play_music('dungeon')
+    def run(self, threaded=False, first_frame_only=False,
+            profile_startup=False):
         self.running = True
 
+        # when threaded, the simulation keeps its own rate and the scheduler
+        # only paces drawing
+        simulation = None
+        if threaded:
+            simulation = SimulationThread(self, UPDATE_RATE)
+            simulation.start()
+            self.scheduler = FrameScheduler(TARGET_FPS)
+        else:
+            self.scheduler = FrameScheduler(TARGET_FPS, UPDATE_RATE)
+
+        scheduler = self.scheduler
+        scheduler.start()
+        if self.profiler:
+            self.profiler.start()
+
         try:
             while self.running:
-                td = clock.tick(60)
-                self.handle_input()
-                self.update(td)
-                self.update(td)
-                self.update(td)
-                self.draw(screen)
-                pygame.display.flip()
+                with self.profile('input'):
+                    self.handle_input()
+
+                for tick in scheduler.ticks():
+                    self.update(UPDATE_TIME)
+
+                if scheduler.should_draw():
+                    with scheduler.drawing(), self.profile('draw'):
+                        rects = self.draw(screen)
+                        if rects is None:
+                            pygame.display.flip()
+                        elif rects:
+                            pygame.display.update(rects)
+                        self.audio.update(self.snapshots.latest.camera)
+
+                    if startup.first_frame_time is None:
+                        startup.first_frame()
+                        if profile_startup:
+                            startup.dump()
+                        if first_frame_only:
+                            self.running = False
+                        else:
+                            self.start_audio()
+
+                if self.profiler:
+                    self.profiler.end_frame()
+
+                scheduler.end_frame()
 
         except KeyboardInterrupt:
             self.running = False
 
-        pygame.mixer.music.stop()
+        if simulation is not None:
+            self.running = False
+            simulation.join()
+
+        if pygame.mixer.get_init():
+            self.audio.stop()
+            pygame.mixer.music.stop()
+
+        if self.streamer is not None:
+            self.streamer.stop()
+
+        if self.profiler:
+            self.profiler.dump()
+            self.profiler.stop()
 
     def actorcollide(self, actor):
         # return actor colliding with another actor
         for body in self.physicsgroup.test_collision_bbox(actor.body.bbox):
-            yield self.body_mapping[body]
+            yield self.actors[body.handle]
 
     def bboxcollide(self, bbox):
         # return actor colliding with bbox
         for body in self.physicsgroup.test_collision_bbox(bbox):
-            yield self.body_mapping[body]
+            yield self.actors[body.handle]
 
 
-class CastleBatsSprite(pygame.sprite.Sprite):
-    animations = {}
-    sounds = {}
+class SimulationThread(threading.Thread):
+    """
+    Run Game.update at a fixed rate, apart from drawing
+
+    The game publishes a snapshot at the end of every update, so drawing
+    on the main thread can run at its own pace.  A slow draw will not slow
+    down the simulation.
+    """
+
+    def __init__(self, game, rate):
+        super().__init__(name='simulation', daemon=True)
+        self.game = game
+        self.period = 1.0 / rate
+
+    def run(self):
+        game = self.game
+        next_tick = time.perf_counter()
+        try:
+            while game.running:
+                game.update(UPDATE_TIME)
+                next_tick += self.period
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
 
-    def __init__(self):
+                # too far behind to catch up; drop the missed ticks
+                elif delay < -self.period * 10:
+                    next_tick = time.perf_counter()
+        except:
+            game.running = False
+            raise
+
+
+class CastleBatsSprite(pygame.sprite.Sprite):
+    """
+    Base class for actors
+
+    Position, velocity, animation timing and if the actor is alive are kept
+    in the actor's row of the World, where they are updated for every actor
+    at once.  The actor object keeps the animation frames and the image of
+    the current frame.
+
+    An actor only has a row in the World while it is in the game: the row
+    is made by spawn, which the Game calls when the actor is added, and is
+    destroyed when the actor is removed.  spawn also resets the actor, so
+    an actor that is added again is left as if it were new.
+    """
+
+    # filled by load_animations, once for each class
+    animations = None
+    category = ecs.ENEMY
+    layer = 0
+
+    def __init__(self, world, body):
         super().__init__()
         self.group = None
+        self.handle = None
+        self.body = body
+        self.world = world
         self.axis = None
         self.image = None
         self.flip = False
-        self.alive = True
         self.state = []
-        self.animation_timer = 0
-        self.current_animation = []
+        self.frames = ()
+        self.entity = None
+
+    def spawn(self):
+        """
+        reset the actor and add it to the World
+        """
+        body = self.body
+        body.acc.x = body.acc.y = body.acc.z = 0.0
+        body.vel.x = body.vel.y = body.vel.z = 0.0
+        body.handle = None
+        self.group = None
+        self.handle = None
+        self.flip = False
+        self.state = []
+        self.entity = self.world.create(self.category, body, self)
+
+    # an actor that is not in the World is not alive, and cannot be brought
+    # back by setting alive
+    @property
+    def alive(self):
+        world = self.world
+        return (self.entity in world and
+                bool(world.alive[world.row(self.entity)]))
+
+    @alive.setter
+    def alive(self, value):
+        world = self.world
+        if self.entity in world:
+            world.alive[world.row(self.entity)] = value
 
     @classmethod
     def load_animations(cls):
-        s = load_image(cls.sprite_sheet)
+        if 'animations' in cls.__dict__:
+            return
 
+        # frames are views into the cached sheet, not copies.  each frame is
+        # stored with its mirror image, indexed by the sprite's flip flag
+        s = load_image(cls.sprite_sheet)
+        animations = {}
         for name, ttl, tiles in cls.image_animations:
             frames = []
             for x1, y1, w, h, ax, ay in tiles:
-                image = pygame.Surface((w, h))
-                image.blit(s, (0, 0), (x1, y1, w, h))
-                image.set_colorkey(image.get_at((0, 0)))
-                frames.append((image, physics.Vector3(0, ax, ay)))
-            cls.animations[name] = ttl, frames
+                image = s.subsurface((x1, y1, w, h))
+                colorkey = image.get_at((0, 0))
+                image.set_colorkey(colorkey)
+                flipped = pygame.transform.flip(image, 1, 0)
+                flipped.set_colorkey(colorkey)
+                frames.append(((image, physics.Vector3(0, ax, ay)),
+                               (flipped, physics.Vector3(0, w - ax, ay))))
+            animations[name] = ttl, frames
+        cls.animations = animations
 
-    @classmethod
-    def load_sounds(cls):
-        for name in cls.required_sounds:
-            cls.sounds[name] = load_sound(name)
+    def show_frame(self, index):
+        # frames and axes are shared by every sprite; do not change them
+        self.image, self.axis = self.frames[index][self.flip]
 
-    def update(self, dt):
-        if self.animation_timer > 0:
-            self.animation_timer -= dt
-            if self.animation_timer <= 0:
-                try:
-                    self.set_frame(next(self.current_animation))
-                except StopIteration:
-                    self.set_animation('idle')
-
-    def set_frame(self, frame):
-        self.animation_timer, frame = frame
-        self.image, axis = frame
-        self.axis = axis.copy()
-        if self.flip:
-            w, h = self.image.get_size()
-            self.image = pygame.transform.flip(self.image, 1, 0)
-            self.axis.y = w - self.axis.y
-
-    def set_animation(self, name, func=None):
-        self.animation_timer, animation = self.animations[name]
-
-        if func:
-            if len(animation) == 1:
-                animation = func(animation[0])
-            else:
-                animation = func(animation)
+    def set_animation(self, name, mode=ecs.ONCE):
+        ttl, self.frames = self.animations[name]
+        self.world.start_animation(self.entity, ttl, len(self.frames), mode)
+        self.show_frame(0)
 
-        self.current_animation = zip(itertools.repeat(self.animation_timer), animation)
-        self.set_frame(next(self.current_animation))
+    def animation_finished(self):
+        self.set_animation('idle', ecs.HOLD)
 
 
 class Hero(CastleBatsSprite):
     sprite_sheet = 'elisa-spritesheet1.png'
-    required_sounds = ['sword']
     name = 'hero'
+    category = ecs.HERO
 
     image_animations = [
         ('idle',      100, ((10, 10, 34, 44, 15, 42), )),
@@ -310,23 +907,20 @@ class Hero(CastleBatsSprite):
                             (190, 130, 28, 44, 14, 40))),
     ]
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, world):
         bbox = physics.BBox((0, 0, 0, 32, 32, 40))
-        self.body = physics.Body3(bbox, (0, 0), (0, 0))
+        super().__init__(world, physics.Body3(bbox, (0, 0), (0, 0)))
         self.load_animations()
-        self.load_sounds()
-        self.change_state('idle')
 
-    def update(self, dt):
-        super().update(dt)
+    def spawn(self):
+        super().spawn()
+        self.change_state('idle')
 
     def change_state(self, state):
         self.state.append(state)
 
         if 'attacking' in self.state:
-            self.sounds['sword'].stop()
-            self.sounds['sword'].play()
+            self.group.play_sound('sword', self)
             self.set_animation('attacking')
             self.state.remove('attacking')
 
@@ -341,10 +935,10 @@ class Hero(CastleBatsSprite):
                     actor.alive = False
 
         elif 'walking' in self.state:
-            self.set_animation('walking', itertools.cycle)
+            self.set_animation('walking', ecs.LOOP)
 
         elif 'idle' in self.state:
-            self.set_animation('idle', itertools.repeat)
+            self.set_animation('idle', ecs.HOLD)
 
     def handle_input(self, event):
         # big ugly bunch of if statements... poor man's state machine
@@ -395,16 +989,20 @@ class Hero(CastleBatsSprite):
 class Bat(CastleBatsSprite):
     sprite_sheet = 'bat.png'
     name = 'bat'
+    category = ecs.SWARM
 
     image_animations = [
         ('flying',    700, ((8, 5, 19, 23, 15, 0), (42, 5, 19, 16, 16, 5))),
     ]
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, world):
         bbox = physics.BBox((0, 0, 0, 20, 20, 20))
-        self.body = physics.Body3(bbox, (0, 0), (0, 0), gravity=False)
+        super().__init__(world, physics.Body3(bbox, (0, 0), (0, 0),
+                                              gravity=False, solid=False))
         self.load_animations()
+
+    def spawn(self):
+        super().spawn()
         self.change_state('flying')
         self.body.vel.y = 1.0
 
@@ -412,18 +1010,51 @@ class Bat(CastleBatsSprite):
         self.state.append(state)
 
         if 'flying' in self.state:
-            self.set_animation('flying', itertools.cycle)
+            self.set_animation('flying', ecs.LOOP)
 
 
 if __name__ == '__main__':
-    screen = init_screen(900, 500)
-    pygame.display.set_caption('Castle Bats')
-    pygame.font.init()
-    pygame.mixer.init(buffer=0)
+    parser = argparse.ArgumentParser(description='Castle Bats')
+    parser.add_argument('--threaded', action='store_true',
+                        help='run the simulation on its own thread')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='only update the parts of the screen that '
+                             'changed while the camera is still')
+    parser.add_argument('--zoom', type=float, default=1,
+                        help='camera zoom; whole numbers scale fastest')
+    parser.add_argument('--stream', action='store_true',
+                        help='keep only the part of the level near the '
+                             'camera loaded')
+    parser.add_argument('--bat-pool', type=int, default=BAT_POOL_SIZE,
+                        help='removed bats kept to be spawned again')
+    parser.add_argument('--swarm', type=int, default=1,
+                        help='bats spawned together each time')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print the time taken by imports and each '
+                             'step of startup, after the first frame')
+    parser.add_argument('--first-frame-only', action='store_true',
+                        help='quit after the first frame; for timing '
+                             'startup')
+    parser.add_argument('--profile-allocations', action='store_true',
+                        help='trace allocations each frame; press F9 to '
+                             'print a report')
+    args = parser.parse_args()
+    if args.profile_allocations and args.threaded:
+        # tracemalloc measures the whole process, so the sections of the
+        # two threads would reset each other's peaks
+        parser.error('--profile-allocations cannot be used with --threaded')
+
+    with startup.step('display'):
+        screen = init_screen(900, 500)
+        pygame.display.set_caption('Castle Bats')
+
+    game = Game(args.dirty_rects, args.zoom, args.stream, args.bat_pool,
+                args.swarm)
+    if args.profile_allocations:
+        game.enable_allocation_profiler()
 
-    game = Game()
     try:
-        game.run()
+        game.run(args.threaded, args.first_frame_only, args.profile_startup)
     except:
         pygame.quit()
         raise
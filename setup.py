@@ -20,14 +20,17 @@ setup(name="PyTMX",
       description='Simple Game - python3',
       author='bitcraft',
       packages=['castlebats'],
-      install_requires=['pygame', 'pytmx', 'pyscroll'],
+      install_requires=['pygame', 'pytmx', 'pyscroll', 'numpy'],
+      python_requires='>=3.10',
       license="LGPLv3",
       long_description='see https://github.com/bitcraft/castlebats',
       classifiers=[
           "Intended Audience :: Developers",
           "Development Status :: 4 - Beta",
           "License :: OSI Approved :: GNU Lesser General Public License v3 (LGPLv3)",
-          "Programming Language :: Python :: 3.3",
+          "Programming Language :: Python :: 3",
+          "Programming Language :: Python :: 3 :: Only",
+          "Programming Language :: Python :: 3.10",
           "Topic :: Games/Entertainment",
       ],
 )
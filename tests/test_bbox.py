@@ -0,0 +1,94 @@
+import itertools
+import random
+import unittest
+
+from physics.bbox import BBox
+
+
+def cells(bbox):
+    # every unit cell inside a bbox with whole number values
+    x, y, z, d, w, h = (int(v) for v in bbox)
+    return set(itertools.product(range(x, x + d), range(y, y + w),
+                                 range(z, z + h)))
+
+
+def random_bbox(rng):
+    return BBox([rng.randint(-3, 3) for i in range(3)] +
+                [rng.randint(1, 4) for i in range(3)])
+
+
+class TestBBox(unittest.TestCase):
+    def test_collide_matches_cells(self):
+        rng = random.Random(1)
+        for i in range(500):
+            a = random_bbox(rng)
+            b = random_bbox(rng)
+            overlap = bool(cells(a) & cells(b))
+            self.assertEqual(a.collidebbox(b), overlap, (a, b))
+            self.assertEqual(b.collidebbox(a), overlap, (a, b))
+
+    def test_clip_matches_cells(self):
+        rng = random.Random(2)
+        for i in range(500):
+            a = random_bbox(rng)
+            b = random_bbox(rng)
+            self.assertEqual(cells(a.clip(b)), cells(a) & cells(b), (a, b))
+
+    def test_union_covers_both(self):
+        rng = random.Random(3)
+        for i in range(500):
+            a = random_bbox(rng)
+            b = random_bbox(rng)
+            union = a.union(b)
+            both = cells(a) | cells(b)
+            self.assertTrue(both <= cells(union))
+            for axis in range(3):
+                self.assertEqual(min(c[axis] for c in both), union[axis])
+                self.assertEqual(max(c[axis] for c in both) + 1,
+                                 union[axis] + union[axis + 3])
+
+    def test_touching_faces_do_not_collide(self):
+        a = BBox((0, 0, 0, 2, 2, 2))
+        self.assertFalse(a.collidebbox((2, 0, 0, 2, 2, 2)))
+        self.assertFalse(a.collidebbox((0, -2, 0, 2, 2, 2)))
+        self.assertTrue(a.collidebbox((1.9, 0, 0, 2, 2, 2)))
+
+    def test_clip_edge_cases(self):
+        a = BBox((0, 0, 0, 2, 2, 2))
+
+        # touching faces give a bbox with no depth on that face
+        self.assertEqual(a.clip((2, 0, 0, 2, 2, 2)), (2, 0, 0, 0, 2, 2))
+
+        # apart gives no size at the origin of the clipped bbox
+        self.assertEqual(a.clip((5, 5, 5, 1, 1, 1)), (0, 0, 0, 0, 0, 0))
+
+        # inside gives the inner bbox
+        self.assertEqual(a.clip((.5, .5, .5, 1, 1, 1)),
+                         (.5, .5, .5, 1, 1, 1))
+
+    def test_union_in_place_and_unionall(self):
+        a = BBox((0, 0, 0, 1, 1, 1))
+        self.assertEqual(a.unionall((2, 2, 2, 1, 1, 1), (-1, 0, 0, 1, 1, 1)),
+                         (-1, 0, 0, 4, 3, 3))
+        a.union_ip((0, 0, 0, 1, 1, 1))
+        self.assertEqual(a, (0, 0, 0, 1, 1, 1))
+
+    def test_normalized(self):
+        self.assertEqual(BBox((4, 4, 4, -2, 3, -1)).normalized(),
+                         (2, 4, 3, 2, 3, 1))
+        positive = BBox((1, 2, 3, 4, 5, 6))
+        self.assertEqual(positive.normalized(), positive)
+        self.assertIsNot(positive.normalized(), positive)
+
+    def test_index_access(self):
+        a = BBox((1, 2, 3, 4, 5, 6))
+        self.assertEqual(a[-1], 6)
+        self.assertEqual(a[:3], (1, 2, 3))
+        a[:3] = 0, 0, 0
+        self.assertEqual(a.origin, (0, 0, 0))
+        self.assertRaises(IndexError, a.__getitem__, 6)
+        self.assertRaises(ValueError, a.__setitem__, slice(0, 3), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import random
+import unittest
+
+import numpy
+import pygame
+
+from physics.bbox import BBox
+from physics.bboxarray import BBoxArray
+
+
+def random_bboxes(rng, count):
+    # few distinct values, so there are many touching and nested boxes
+    return [BBox([rng.randint(0, 6) for i in range(3)] +
+                 [rng.randint(0, 3) for i in range(3)])
+            for i in range(count)]
+
+
+class TestBBoxArray(unittest.TestCase):
+    def test_collide_pairs_matches_collidebbox(self):
+        rng = random.Random(1)
+        for i in range(20):
+            bboxes = random_bboxes(rng, 30)
+            others = random_bboxes(rng, 20)
+            array = BBoxArray(bboxes)
+
+            mask = array.collide_pairs(BBoxArray(others))
+            for a, row in zip(bboxes, mask.tolist()):
+                self.assertEqual(row, [a.collidebbox(b) for b in others])
+
+            mask = array.collide_pairs()
+            for i, (a, row) in enumerate(zip(bboxes, mask.tolist())):
+                want = [j != i and a.collidebbox(b)
+                        for j, b in enumerate(bboxes)]
+                self.assertEqual(row, want)
+
+    def test_collidelistall_matches_collidebbox(self):
+        rng = random.Random(2)
+        bboxes = random_bboxes(rng, 50)
+        array = BBoxArray(bboxes)
+        for bbox in random_bboxes(rng, 50):
+            want = [i for i, other in enumerate(bboxes)
+                    if other.collidebbox(bbox)]
+            self.assertEqual(array.collidelistall(bbox), want)
+
+    def test_unionall(self):
+        rng = random.Random(3)
+        bboxes = random_bboxes(rng, 10)
+        self.assertEqual(BBoxArray(bboxes).unionall(),
+                         bboxes[0].unionall(*bboxes[1:]))
+        self.assertRaises(ValueError, BBoxArray().unionall)
+
+    def test_index(self):
+        array = BBoxArray([(i, 0, 0, 1, 1, 1) for i in range(5)])
+        self.assertEqual(array[1], (1, 0, 0, 1, 1, 1))
+        self.assertEqual(array[-1], (4, 0, 0, 1, 1, 1))
+
+        part = array[1:3]
+        self.assertIsInstance(part, BBoxArray)
+        self.assertEqual(part.to_bboxes(),
+                         [(1, 0, 0, 1, 1, 1), (2, 0, 0, 1, 1, 1)])
+        self.assertEqual(len(array[numpy.array([0, 4])]), 2)
+
+        # slices are copies
+        part.move(10, 0, 0)
+        self.assertEqual(array[1], (1, 0, 0, 1, 1, 1))
+
+        self.assertRaises(TypeError, array.__getitem__, (0, 1))
+
+    def test_from_rects(self):
+        array = BBoxArray.from_rects([pygame.Rect(1, 2, 3, 4)])
+        self.assertEqual(array[0], (0, 1, 2, 1, 3, 4))
+        self.assertEqual(array.to_rects(), [pygame.Rect(1, 2, 3, 4)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import random
+import unittest
+
+import physics
+from castlebats import ecs
+
+
+def body(x=0, y=0, z=0):
+    return physics.Body3(physics.BBox((x, y, z, 2, 2, 2)), (0, 0), (0, 0))
+
+
+class TestWorld(unittest.TestCase):
+    def check(self, world, model):
+        # every live entity finds its own row, and the rows are packed
+        self.assertEqual(len(world), len(model))
+        self.assertEqual(sorted(world.entities), sorted(model))
+        for entity, (b, actor) in model.items():
+            self.assertIn(entity, world)
+            row = world.row(entity)
+            self.assertIs(world.entities[row], entity)
+            self.assertIs(world.bodies[row], b)
+            self.assertIs(world.actors[row], actor)
+            self.assertEqual(world.position[row].tolist(),
+                             list(b.bbox.origin))
+
+    def test_swap_remove_keeps_rows(self):
+        rng = random.Random(1)
+        world = ecs.World(capacity=4)
+        model = {}
+        destroyed = []
+        for i in range(500):
+            if model and rng.random() < .45:
+                entity = rng.choice(list(model))
+                world.destroy(entity)
+                del model[entity]
+                destroyed.append(entity)
+            else:
+                b = body(i, i, i)
+                actor = object()
+                model[world.create(ecs.ENEMY, b, actor)] = b, actor
+            self.check(world, model)
+
+        for entity in destroyed:
+            self.assertNotIn(entity, world)
+            self.assertRaises(KeyError, world.row, entity)
+
+    def test_create_resets_row(self):
+        world = ecs.World()
+        entity = world.create(ecs.ENEMY, body())
+        world.alive[world.row(entity)] = False
+        world.anim_frame[world.row(entity)] = 3
+        world.destroy(entity)
+
+        entity = world.create(ecs.HERO, body(1, 2, 3))
+        row = world.row(entity)
+        self.assertTrue(world.alive[row])
+        self.assertEqual(world.anim_frame[row], 0)
+        self.assertEqual(world.category[row], ecs.HERO)
+        self.assertEqual(world.position[row].tolist(), [1, 2, 3])
+
+    def test_advance_animation(self):
+        world = ecs.World()
+        rows = {}
+        for mode in (ecs.ONCE, ecs.LOOP, ecs.HOLD):
+            entity = world.create(ecs.ENEMY, body())
+            world.start_animation(entity, 10, 2, mode)
+            rows[mode] = world.row(entity)
+
+        changed, finished = ecs.advance_animation(world, 10)
+        self.assertEqual(sorted(changed.tolist()), sorted(rows.values()))
+        self.assertEqual(finished.tolist(), [])
+
+        changed, finished = ecs.advance_animation(world, 10)
+        self.assertEqual(changed.tolist(), [rows[ecs.LOOP]])
+        self.assertEqual(finished.tolist(), [rows[ecs.ONCE]])
+        frames = world.anim_frame
+        self.assertEqual([frames[rows[m]] for m in (ecs.ONCE, ecs.LOOP,
+                                                     ecs.HOLD)], [1, 0, 1])
+
+    def test_dead_fallen_and_in_view(self):
+        world = ecs.World()
+        near = world.create(ecs.ENEMY, body(0, 0, 0))
+        far = world.create(ecs.ENEMY, body(0, 100, 0))
+        low = world.create(ecs.ENEMY, body(0, 0, 50))
+        ecs.check_fallen(world, 40)
+        dead = ecs.find_dead(world).tolist()
+        self.assertEqual(dead, [world.row(low)])
+
+        view = ecs.in_view(world, (0, -10, -10), (10, 10, 10)).tolist()
+        self.assertTrue(view[world.row(near)])
+        self.assertFalse(view[world.row(far)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import gc
+import unittest
+from unittest import mock
+
+from physics.memoize import memoize
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+
+class TestMemoize(unittest.TestCase):
+    def test_lru_eviction(self):
+        calls = []
+
+        @memoize(maxsize=2)
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        double(1)
+        double(2)
+        double(1)           # 1 is now the most recently used
+        double(3)           # drops 2
+        self.assertEqual(double(1), 2)
+        self.assertEqual(double(2), 4)
+        self.assertEqual(calls, [1, 2, 3, 2])
+
+        info = double.info()
+        self.assertEqual((info.hits, info.misses), (2, 4))
+        self.assertEqual(info.evictions, 2)
+        self.assertEqual(info.size, 2)
+
+    def test_ttl_expiry(self):
+        calls = []
+
+        @memoize(ttl=1.0)
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        with mock.patch('physics.memoize.time.monotonic') as now:
+            now.return_value = 100.0
+            double(1)
+            now.return_value = 100.5
+            double(1)
+            now.return_value = 101.5
+            double(1)
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(double.info().evictions, 1)
+
+    def test_tick(self):
+        tick = [0]
+        calls = []
+
+        @memoize(tick=lambda: tick[0])
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        double(1)
+        double(1)
+        tick[0] += 1
+        double(1)
+        self.assertEqual(calls, [1, 1])
+
+    def test_per_instance_released_with_instance(self):
+        class Obj(Counter):
+            @memoize
+            def add(self, x):
+                self.calls += 1
+                return x + 1
+
+        method = Obj.__dict__['add']
+        a = Obj()
+        b = Obj()
+        self.assertEqual(a.add(1), 2)
+        self.assertEqual(a.add(1), 2)
+        self.assertEqual(b.add(1), 2)
+        self.assertEqual((a.calls, b.calls), (1, 1))
+        self.assertEqual(len(method.instance_caches), 2)
+
+        del a
+        gc.collect()
+        self.assertEqual(len(method.instance_caches), 1)
+
+        # counters of the dropped instance are kept
+        info = method.info()
+        self.assertEqual((info.hits, info.misses, info.size), (1, 2, 1))
+
+    def test_shared_cache_keys_on_instance(self):
+        class Obj(Counter):
+            @memoize(per_instance=False)
+            def add(self, x):
+                self.calls += 1
+                return x + 1
+
+        a = Obj()
+        a.add(1)
+        a.add(1)
+        Obj().add(1)
+        self.assertEqual(a.calls, 1)
+        self.assertEqual(Obj.__dict__['add'].info().misses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import gc
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import run_game
+from castlebats import ecs
+from castlebats.pool import ActorPool
+
+
+run_game.RESOURCE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(run_game.__file__)), 'resources')
+
+
+class TestActorPool(unittest.TestCase):
+    def setUp(self):
+        self.world = ecs.World()
+        self.pool = ActorPool(lambda: run_game.Bat(self.world), 2, 'bat')
+
+    # what Game.apply_commands does for 'add' and 'remove'
+    def add(self, bat):
+        bat.spawn()
+
+    def remove(self, bat):
+        self.world.destroy(bat.entity)
+        self.pool.release(bat)
+
+    def test_acquire_makes_no_world_row(self):
+        bat = self.pool.acquire()
+        self.assertEqual(len(self.world), 0)
+        self.assertFalse(bat.alive)
+
+    def test_reused_bat_is_reset(self):
+        bat = self.pool.acquire()
+        self.add(bat)
+        row = self.world.row(bat.entity)
+        bat.body.vel.z = 5.0
+        bat.body.acc.y = 2.0
+        bat.flip = True
+        bat.state.append('attacking')
+        bat.alive = False
+        self.world.anim_frame[row] = 1
+        self.world.anim_timer[row] = 3
+        self.remove(bat)
+        self.assertEqual(len(self.world), 0)
+
+        again = self.pool.acquire()
+        self.assertIs(again, bat)
+        self.add(again)
+        row = self.world.row(again.entity)
+        self.assertEqual(tuple(again.body.vel), (0.0, 1.0, 0.0))
+        self.assertEqual(tuple(again.body.acc), (0.0, 0.0, 0.0))
+        self.assertFalse(again.flip)
+        self.assertEqual(again.state, ['flying'])
+        self.assertTrue(again.alive)
+        self.assertEqual(self.world.anim_frame[row], 0)
+        self.assertEqual(self.world.anim_mode[row], ecs.LOOP)
+        self.assertEqual(self.world.anim_timer[row],
+                         self.world.anim_ttl[row])
+        self.assertEqual(len(self.world), 1)
+
+    def test_stats(self):
+        bats = [self.pool.acquire() for i in range(3)]
+        self.assertEqual(self.pool.in_use, 3)
+        self.assertEqual(self.pool.high_water, 3)
+        for bat in bats:
+            self.add(bat)
+            self.remove(bat)
+        self.assertEqual(self.pool.in_use, 0)
+        self.assertEqual(len(self.pool.free), 2)
+        self.assertEqual(self.pool.dropped, 1)
+
+        self.pool.acquire()
+        self.assertEqual(self.pool.reused, 1)
+        self.assertEqual(self.pool.created, 3)
+        self.assertEqual(self.pool.high_water, 3)
+
+    def test_bat_thrown_away_is_not_in_use(self):
+        self.pool.acquire()
+        gc.collect()
+        self.assertEqual(self.pool.in_use, 0)
+        self.assertEqual(self.pool.high_water, 1)
+
+    def test_release_twice(self):
+        bat = self.pool.acquire()
+        self.add(bat)
+        self.remove(bat)
+        self.assertRaises(ValueError, self.pool.release, bat)
+
+
+if __name__ == '__main__':
+    unittest.main()
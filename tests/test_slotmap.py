@@ -0,0 +1,42 @@
+import unittest
+
+from castlebats.slotmap import SlotMap
+
+
+class TestSlotMap(unittest.TestCase):
+    def test_insert_and_get(self):
+        slots = SlotMap()
+        a = slots.insert('a')
+        b = slots.insert('b')
+        self.assertEqual(slots[a], 'a')
+        self.assertEqual(slots[b], 'b')
+        self.assertEqual(len(slots), 2)
+
+    def test_removed_handle_is_stale(self):
+        slots = SlotMap()
+        a = slots.insert('a')
+        slots.remove(a)
+        b = slots.insert('b')
+        self.assertNotIn(a, slots)
+        self.assertIn(b, slots)
+        self.assertRaises(KeyError, slots.__getitem__, a)
+        self.assertRaises(KeyError, slots.remove, a)
+
+    def test_contains_handle_never_added(self):
+        slots = SlotMap()
+        slots.insert('a')
+        self.assertNotIn(None, slots)
+        self.assertNotIn('a', slots)
+        self.assertNotIn(1.0, slots)
+
+    def test_remove_keeps_values_packed(self):
+        slots = SlotMap()
+        handles = [slots.insert(i) for i in range(4)]
+        slots.remove(handles[1])
+        self.assertEqual(sorted(slots), [0, 2, 3])
+        for handle in handles[2:]:
+            self.assertEqual(slots[handle], handles.index(handle))
+
+
+if __name__ == '__main__':
+    unittest.main()
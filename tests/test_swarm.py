@@ -0,0 +1,68 @@
+import unittest
+
+import numpy
+
+import physics
+from castlebats import ecs
+from castlebats.swarm import Swarm, neighbours
+
+
+def brute_force(points, radius):
+    pairs = set()
+    for i, a in enumerate(points.tolist()):
+        for j, b in enumerate(points.tolist()):
+            if i != j and (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 < radius ** 2:
+                pairs.add((i, j))
+    return pairs
+
+
+class TestNeighbours(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = numpy.random.default_rng(1)
+        for n in (0, 1, 2, 10, 200):
+            for spread in (30, 300, 3000):
+                points = rng.uniform(-spread, spread, (n, 2))
+                i, j = neighbours(points, 40)
+                pairs = set(zip(i.tolist(), j.tolist()))
+                self.assertEqual(len(pairs), len(i))
+                self.assertEqual(pairs, brute_force(points, 40))
+
+    def test_cell_edges(self):
+        # on the edges of cells, and exactly radius apart
+        points = numpy.array([[0, 0], [40, 0], [39.9, 0], [-40, -40],
+                              [-.1, -.1], [80, 80]], dtype=float)
+        i, j = neighbours(points, 40)
+        self.assertEqual(set(zip(i.tolist(), j.tolist())),
+                         brute_force(points, 40))
+
+
+class TestSwarm(unittest.TestCase):
+    def test_update_writes_bodies(self):
+        world = ecs.World()
+        bodies = []
+        for y in (0, 10, 500):
+            b = physics.Body3(physics.BBox((0, y, 0, 20, 20, 20)), (0, 0),
+                              (0, 1, 0), gravity=False)
+            world.create(ecs.SWARM, b)
+            bodies.append(b)
+        hero = physics.Body3(physics.BBox((0, 0, 0, 20, 20, 20)), (0, 0),
+                             (0, 0))
+        world.create(ecs.HERO, hero)
+
+        swarm = Swarm(speed=1.5)
+        ecs.sync_bodies(world)
+        swarm.update(world, (300, 300), 1000)
+
+        self.assertEqual(tuple(hero.vel), (0, 0, 0))
+        for row, b in enumerate(bodies):
+            self.assertEqual(b.vel.x, 0)
+            self.assertLessEqual(abs(b.vel) - 1e-9, 1.5)
+            self.assertEqual(world.velocity[row, 1:].tolist(),
+                             [b.vel.y, b.vel.z])
+
+        # the two close bats are pushed apart
+        self.assertLess(bodies[0].vel.y, bodies[1].vel.y)
+
+
+if __name__ == '__main__':
+    unittest.main()